@@ -0,0 +1,49 @@
+// Debounced filter snapshots of the summary tab of the aqueon case page.
+// Every change of the producer, injector, layer, faultblock and compartment dropdowns
+// waits for the debounce delay. Only the last change of a burst writes a new snapshot,
+// with a version one above the previous one, unless no filter actually changed.
+// tab is generated with every render of the page layout, so the versions of another case
+// opened in the same browser tab start over without looking stale to the server.
+(function() {
+    var ticket = 0;
+    var keys = ['prods', 'injs', 'layers', 'fbs', 'comps'];
+
+    function sameValues(a, b) {
+        a = (a || []).slice().sort();
+        b = (b || []).slice().sort();
+        return a.length === b.length && a.every(function(v, i) { return v === b[i]; });
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        filter_state: {
+            snapshot_filters: function(prods, injs, layers, fbs, comps, debounce_ms, tab, current) {
+                var values = {'prods': prods, 'injs': injs, 'layers': layers, 'fbs': fbs, 'comps': comps};
+                var mine = ++ticket;
+                return new Promise(function(resolve) {
+                    setTimeout(function() {
+                        // a newer change arrived while waiting, it writes the snapshot
+                        if (mine !== ticket) {
+                            resolve(window.dash_clientside.no_update);
+                            return;
+                        }
+                        var changed = keys.filter(function(k) {
+                            return !current || !sameValues(values[k], current[k]);
+                        });
+                        if (changed.length === 0) {
+                            resolve(window.dash_clientside.no_update);
+                            return;
+                        }
+                        var snapshot = {
+                            'tab': tab,
+                            'version': current ? current.version + 1 : 1
+                        };
+                        keys.forEach(function(k) {
+                            snapshot[k] = values[k] || [];
+                        });
+                        resolve(snapshot);
+                    }, debounce_ms || 0);
+                });
+            }
+        }
+    });
+})();
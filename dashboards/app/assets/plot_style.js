@@ -0,0 +1,139 @@
+// Clientside restyling of the phase plots of the aqueon case page.
+// The server tags every trace with meta = {role, group, ngroups, type_of_fit, unit_factors}
+// and the appearance settings and units are applied here to the figure already in the browser.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    plot_style: {
+        restyle_phase_plot: function(
+            y_scale,
+            actual_linestyle,
+            actual_width,
+            actual_shape,
+            actual_mode,
+            actual_color,
+            actual_alpha,
+            fit_training_color,
+            fit_training_alpha,
+            fit_validation_color,
+            fit_validation_alpha,
+            fit_line_color,
+            fit_line_alpha,
+            colormap_samples,
+            colormap_alpha,
+            figure
+        ) {
+            if (!figure || !figure.data || !colormap_samples) {
+                return window.dash_clientside.no_update;
+            }
+
+            // same format as hex_to_rgba_str and colormap_colors on the server
+            function hexToRgba(hex, alpha) {
+                hex = hex.replace('#', '');
+                var r = parseInt(hex.substring(0, 2), 16);
+                var g = parseInt(hex.substring(2, 4), 16);
+                var b = parseInt(hex.substring(4, 6), 16);
+                return 'rgba(' + r + ',' + g + ',' + b + ',' + alpha + ')';
+            }
+
+            // color of group i out of n, like get_cmap(colormap, n)(i)
+            function colormapColor(i, n, alpha) {
+                var colors = colormap_samples.colors;
+                var x = n > 1 ? i / (n - 1) : 0;
+                var rgb;
+                if (colormap_samples.listed) {
+                    rgb = colors[Math.min(Math.floor(x * colors.length), colors.length - 1)];
+                } else {
+                    var pos = x * (colors.length - 1);
+                    var lo = Math.min(Math.floor(pos), colors.length - 2);
+                    var frac = pos - lo;
+                    rgb = [0, 1, 2].map(function(k) {
+                        return Math.round(colors[lo][k] + (colors[lo + 1][k] - colors[lo][k]) * frac);
+                    });
+                }
+                return 'rgba(' + rgb[0] + ',' + rgb[1] + ',' + rgb[2] + ',' + alpha + ')';
+            }
+
+            var fit_colors = {
+                'training': {'color': fit_training_color, 'alpha': fit_training_alpha},
+                'validation': {'color': fit_validation_color, 'alpha': fit_validation_alpha}
+            };
+
+            var data = figure.data.map(function(trace) {
+                var meta = trace.meta;
+                if (!meta) {
+                    return trace;
+                }
+                var restyled = Object.assign({}, trace);
+                if (meta.role === 'actual' || meta.role === 'second') {
+                    var color = meta.ngroups === 1
+                        ? hexToRgba(actual_color, actual_alpha)
+                        : colormapColor(meta.group, meta.ngroups, colormap_alpha);
+                    restyled.line = Object.assign({}, trace.line, {'color': color});
+                    if (meta.role === 'actual') {
+                        restyled.mode = actual_mode;
+                        restyled.line = Object.assign(restyled.line, {
+                            'width': actual_width,
+                            'dash': actual_linestyle,
+                            'shape': actual_shape
+                        });
+                    }
+                } else if (meta.role === 'fit') {
+                    var fit = fit_colors[meta.type_of_fit];
+                    restyled.fillcolor = meta.ngroups === 1
+                        ? hexToRgba(fit.color, fit.alpha)
+                        : colormapColor(meta.group, meta.ngroups, fit.alpha);
+                    restyled.line = Object.assign({}, trace.line, {'color': hexToRgba(fit_line_color, fit_line_alpha)});
+                }
+                return restyled;
+            });
+
+            var layout = Object.assign({}, figure.layout);
+            var units = figure.layout.meta ? figure.layout.meta.units : '';
+            layout.yaxis = Object.assign({}, figure.layout.yaxis, {'type': y_scale, 'uirevision': y_scale + '-' + units});
+            return Object.assign({}, figure, {'data': data, 'layout': layout});
+        },
+
+        // Scale the y values of the traces from the units of the figure to the new ones,
+        // with the factors of meta.unit_factors, and swap the axis titles.
+        // Missing values labelled 'NA' by the server are left as they are.
+        convert_units: function(units, figure) {
+            if (!figure || !figure.data || !figure.layout || !figure.layout.meta) {
+                return window.dash_clientside.no_update;
+            }
+            var meta = figure.layout.meta;
+            if (meta.units === units || !meta.unit_titles[units]) {
+                return window.dash_clientside.no_update;
+            }
+            // values sent as typed arrays can't be scaled here, the figure keeps its units
+            var scalable = figure.data.every(function(trace) {
+                return !(trace.meta && trace.meta.unit_factors) || Array.isArray(trace.y);
+            });
+            if (!scalable) {
+                return window.dash_clientside.no_update;
+            }
+
+            var data = figure.data.map(function(trace) {
+                var factors = trace.meta ? trace.meta.unit_factors : null;
+                if (!factors) {
+                    return trace;
+                }
+                var ratio = factors[units] / factors[meta.units];
+                var y = trace.y.map(function(v) {
+                    return typeof v === 'number' ? v * ratio : v;
+                });
+                return Object.assign({}, trace, {'y': y});
+            });
+
+            var titles = meta.unit_titles[units];
+            var layout = Object.assign({}, figure.layout, {'meta': Object.assign({}, meta, {'units': units})});
+            layout.yaxis = Object.assign({}, figure.layout.yaxis, {
+                'title': {'text': titles.y},
+                'uirevision': figure.layout.yaxis.type + '-' + units
+            });
+            layout.yaxis2 = Object.assign({}, figure.layout.yaxis2, {
+                'title': {'text': titles.y2},
+                'uirevision': units
+            });
+            return Object.assign({}, figure, {'data': data, 'layout': layout});
+        }
+    }
+});
@@ -0,0 +1,17 @@
+#Gunicorn settings, read from the working directory when the image starts.
+#Threaded workers only block a thread per callback: the Data Explorer requests of
+#all threads run concurrently on the worker's query loop (see pages/query_client.py).
+import os
+import sys
+
+bind = '0.0.0.0:8080'
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+
+#close the pooled API connections of the worker
+def worker_exit(server, worker):
+    query_client = sys.modules.get('pages.query_client')
+    if query_client is not None:
+        query_client.close_client()
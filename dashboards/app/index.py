@@ -2,6 +2,7 @@
 from app import app, server
 from dash import page_container, page_registry
 import dash_bootstrap_components as dbc
+from pages.prefetch import register_prewarm_route
 app.title = 'Tachyus Dashboards'
 
 app.layout = dbc.Container(
@@ -26,5 +27,7 @@ app.layout = dbc.Container(
     fluid=True
 )
 
+register_prewarm_route(server)
+
 if __name__ == '__main__':
     app.run_server(debug=True, port=8080, host='0.0.0.0')
\ No newline at end of file
@@ -1,16 +1,29 @@
 # region Import Modules
-from dash import register_page,dcc, html, Input, Output, callback, State, no_update, ctx, Dash, redirect, render_template, session, url_for
+from dash import register_page,dcc, html, Input, Output, MATCH, callback, clientside_callback, ClientsideFunction, State, Patch, no_update, ctx, Dash, redirect, render_template, session, url_for
 from dash.exceptions import PreventUpdate
+import uuid
 import dash_bootstrap_components as dbc
-from pypika import PostgreSQLQuery, Schema, CustomFunction, Field, Case,DatePart,Interval,Order
+from pypika import PostgreSQLQuery
 from pypika import functions as fn
-import httpx
 import pandas as pd
 import numpy as np
 from plotly import graph_objects as go
 from matplotlib.pyplot import colormaps, get_cmap
 import dash_ag_grid as dag
 from .settings import load_settings
+from .case_snapshot import run_case_query, submit_case_query
+from .prefetch import prefetch_on_navigation
+from .sql_utils import aqueon
+from .overview import fetch_case_overview
+from .dropdowns import build_wells_dropdown_query, build_zones_dropdown_query
+from .production import select_phase, crossplot_columns, actual_columns
+from .query_builder import production_sql, rollup_sql, fit_sql, crossplot_sql, canonical_filters
+from .downsampling import relayout_x_range, downsample_frame
+from .time_windows import series_resolution, refine_window
+from .leaderboards import leaderboard_dimensions, leaderboard_page_size, leaderboard_rows, leaderboard_column_defs
+from .units import phase_quantities, property_quantities, unit_factors, unit_title, convert_units
+from .filter_state import unpack_filters, drop_if_stale, begin_request
+from .figures import scatter_type, merge_groups, group_colors, break_between_groups, hover_text, colormap_colors, colormap_samples, selection_marker
 # auth0 import modules
 from urllib.parse import quote_plus, urlencode
 from authlib.integrations.dash_client import OAuth
@@ -22,18 +35,6 @@ from dotenv import find_dotenv, load_dotenv
 #Load Environment Variables
 settings = load_settings()
 
-#API URL
-api_url = settings['API_URL']
-
-#Database Connection Headers to API
-headers = {
-    'x-api-key': settings['API_KEY'],
-    'customer': settings['API_CUSTOMER'],
-    'originator': settings['API_ORIGINATOR'],
-    'Content-Type': 'text/plain',
-    'Accept': 'application/json;q=1.0,application/json;q=0.9,*/*;q=0.8'
-}
-
 #Register Page
 register_page(
     __name__,
@@ -43,14 +44,6 @@ register_page(
 
 
 # region Utility Functions
-#Database Schema
-aqueon = Schema('aqueon')
-
-##Custom Function to create Distinct Queries
-distinct = CustomFunction('DISTINCT', ['*'])
-make_date = CustomFunction('MAKE_DATE', ['year','month','day'])
-date_trunc = CustomFunction('DATE_TRUNC', ['interval','date'])
-
 #function to convert hex to rgba
 def hex_to_rgb(hex_color):
     hex_color = hex_color.lstrip("#")
@@ -89,6 +82,12 @@ phases_dict = {
     }
 }
 
+#Leaderboard grids of the ETL tab and the dimension and phase they open with
+etl_leaderboards = {
+    'wells':('wells','oil'),
+    'layers':('reservoirs','oil'),
+}
+
 # endregion
 
 
@@ -138,12 +137,42 @@ def create_card(title,id,icon=None):
         ],className='p-2')    
     ],className='mb-3')
     
-def create_etl_aggrid(title):
+#Leaderboard grid of a dimension and phase. The grid asks the server for its pages, its id
+#holds the ranking so picking another one mounts a new grid instead of reusing the loaded rows.
+def create_leaderboard_grid(title,dimension,phase):
+    return dag.AgGrid(
+        id = {'type':'etl_leaderboard','grid':title,'dimension':dimension,'phase':phase},
+        columnDefs=leaderboard_column_defs(dimension,phase),
+        rowModelType='infinite',
+        dashGridOptions={
+            'pagination':True,
+            'paginationPageSize':leaderboard_page_size,
+            'cacheBlockSize':leaderboard_page_size,
+        },
+        style={"height": "100%", "width": "100%"}
+    )
+
+def create_etl_aggrid(title,dimension,phase):
     return [
-        html.H6(f'{title.capitalize()} Top Producers',className='text-center'),
-        dag.AgGrid(
-            id = f'etl_top_{title}_producers',
-            style={"height": "100%", "width": "100%"}
+        html.H6('Leaderboard',className='text-center'),
+        dbc.Row([
+            dbc.Col(dcc.Dropdown(
+                id=f'etl_top_{title}_dimension',
+                options=[{'label':d['label'],'value':k} for k,d in leaderboard_dimensions.items()],
+                value=dimension,
+                clearable=False
+            )),
+            dbc.Col(dcc.Dropdown(
+                id=f'etl_top_{title}_phase',
+                options=[{'label':p.capitalize(),'value':p} for p in actual_columns],
+                value=phase,
+                clearable=False
+            )),
+        ],className='g-1 mb-1'),
+        html.Div(
+            create_leaderboard_grid(title,dimension,phase),
+            id=f'etl_top_{title}_container',
+            style={"height": "100%"}
         )
     ]
 #example  create_card()
@@ -250,6 +279,8 @@ def create_plot_options(phase):
                         ],
                         value='jet'
                     ),
+                    #samples of the selected colormap for the clientside restyling
+                    dcc.Store(id = f'summary_settings_{phase}_colormap_samples'),
                     dbc.Label('Colormap Alpha', html_for=f'summary_settings_{phase}_colormap_alpha'),
                     dcc.Slider(
                         id = f'summary_settings_{phase}_colormap_alpha',
@@ -336,6 +367,8 @@ def create_plot_options(phase):
 #Main Layout Function. This is the function that will be called when the page is loaded.
 #It receives the case_name as a parameter
 def layout(case_name, **kwargs):
+    #the queries of the first render, or the case snapshot, start while the page renders
+    prefetch_on_navigation(case_name)
     lay = dbc.Container(
         children=[
             dbc.Row([
@@ -343,6 +376,12 @@ def layout(case_name, **kwargs):
                     dbc.Card([
                         dbc.CardHeader(f'Aqueon Case: {case_name}', id='case_name'),
                         dcc.Store(id='case_name_store', data={'case_name': case_name}),
+                        #debounced snapshot of the well and zone filters, see assets/filter_state.js
+                        dcc.Store(id='summary_filter_store'),
+                        dcc.Store(id='summary_filter_tab', data=uuid.uuid4().hex),
+                        dcc.Store(id='summary_filter_debounce', data=settings['FILTER_DEBOUNCE_MS']),
+                        #inputs of the map figure in the browser besides the selected wells
+                        dcc.Store(id='summary_map_rendered'),
                         dbc.CardBody([
                             html.P([html.B('Customer: '), settings["API_CUSTOMER"]], className='mb-0'),
                             html.P([html.B('User: '), settings["API_ORIGINATOR"]], className='mb-0'),
@@ -667,7 +706,7 @@ def layout(case_name, **kwargs):
                                 create_card('Gas Cum',id='etl_gas_cum',icon='fa-solid fa-cloud'),
                                 create_card('Inj Cum',id='etl_injectant_cum',icon='fa-solid fa-droplet'),
                             ],width=2),
-                            *[dbc.Col(create_etl_aggrid(p),width=3) for p in ['wells','layers']]
+                            *[dbc.Col(create_etl_aggrid(title,dimension,phase),width=3) for title,(dimension,phase) in etl_leaderboards.items()]
                         ])
                     ],
                     label='ETL',
@@ -695,201 +734,48 @@ def layout(case_name, **kwargs):
 
 # region Counting Callbacks
 # ---------------------------- Counting Callbacks ---------------------------- #
-##Callback to update the total wells
+##Callback to update the case overview: well counts, layers, fit info and ETL cumulatives.
+##All the cards are filled from one overview fetch instead of a query per card.
 @callback(
     Output('badge_total_wells','children'),
-    Input('case_name_store','data'),
-)
-def update_badge_total_wells(data):
-    case_name = data['case_name']
-    #Table object
-    productiondata = aqueon.productiondata
-    
-    #001-count_total.sql
-    query = PostgreSQLQuery.from_(
-        productiondata
-    ).select(
-        fn.Count(distinct(
-            getattr(productiondata, 'WellAPI')
-        )).as_('total_wells')
-    ).where(getattr(productiondata, 'casename') == case_name)
-    
-    query_str = query.get_sql()
-
-    with httpx.Client(timeout=30) as client:
-        response = client.post(
-            f'{api_url}/dataexplorer/query/tachyus',
-            headers=headers,
-            data=query_str
-        )
-        
-    if response.status_code == 200:
-        data = response.json()
-        total_wells = data[0]['total_wells']
-    return total_wells
-
-## Callback to update the producer wells
-@callback(
     Output('badge_producer_wells','children'),
-    Input('case_name_store','data')
-)
-def update_badge_producer_wells(data):
-    case_name = data['case_name']
-    productiondata = aqueon.productiondata
-    
-    #002-count_producer.sql
-    query = PostgreSQLQuery.from_(
-        productiondata
-    ).select(
-        fn.Count(distinct(
-            getattr(productiondata, 'WellAPI')
-        )).as_('producer_wells')
-    ).where(
-        (getattr(productiondata, 'Qo') + getattr(productiondata, 'Qw') + getattr(productiondata, 'Qg')) > 0,
-    ).where(
-        getattr(productiondata, 'casename') == case_name
-    )
-
-    query_str = query.get_sql()
-
-    with httpx.Client(timeout=30) as client:
-        response = client.post(
-            f'{api_url}/dataexplorer/query/tachyus',
-            headers=headers,
-            data=query_str
-        )
-        
-    if response.status_code == 200:
-        data = response.json()
-        producer_wells = data[0]['producer_wells']
-    return producer_wells
-
-## Callback to update the injector wells
-@callback(
     Output('badge_injector_wells','children'),
-    Input('case_name_store','data')
-)
-def update_badge_injector_wells(data):
-    case_name = data['case_name']
-    productiondata = aqueon.productiondata
-    
-    #003-count_injector.sql
-    query = PostgreSQLQuery.from_(
-        productiondata
-    ).select(
-        fn.Count(distinct(
-            getattr(productiondata, 'WellAPI')
-        )).as_('injector_wells')
-    ).where(
-        getattr(productiondata, 'Qs') > 0
-    ).where(
-        getattr(productiondata, 'casename') == case_name
-    )
-
-    query_str = query.get_sql()
-
-    with httpx.Client(timeout=30) as client:
-        response = client.post(
-            f'{api_url}/dataexplorer/query/tachyus',
-            headers=headers,
-            data=query_str
-        )
-        
-    if response.status_code == 200:
-        data = response.json()
-        injector_wells = data[0]['injector_wells']
-    return injector_wells
-
-## Callback to update Conversion Wells
-@callback(
     Output('badge_conversion_wells','children'),
-    Input('case_name_store','data')
-)
-def update_badge_conversion_wells(data):
-    case_name = data['case_name']
-    productiondata = aqueon.productiondata
-    
-    #004-count_conversion.sql
-    inner_query = PostgreSQLQuery.from_(productiondata) \
-        .select(
-            getattr(productiondata, 'WellAPI'),
-            fn.Count(distinct(getattr(productiondata,'Status'))).as_('status_count')
-        ).where(
-            getattr(productiondata, 'casename') == case_name
-        ).groupby(
-            getattr(productiondata, 'WellAPI')
-        ).having(
-            fn.Count(distinct(getattr(productiondata,'Status'))) > 1
-        )
-        
-    query = PostgreSQLQuery.from_(inner_query) \
-        .select(
-            fn.Count(distinct(Field('WellAPI'))).as_('conversion_wells')
-        )
-    
-
-    query_str = query.get_sql()
-
-    
-    #raise PreventUpdate
-    with httpx.Client(timeout=30) as client:
-        response = client.post(
-            f'{api_url}/dataexplorer/query/tachyus',
-            headers=headers,
-            data=query_str
-        )
-        
-    if response.status_code == 200:
-        data = response.json()
-        conversion_wells = data[0]['conversion_wells']
-    return conversion_wells
-
-## Callback to update Layers
-@callback(
     Output('badge_layers','children'),
     Output('badge_faultblock','children'),
     Output('badge_compartment','children'),
-    Input('case_name_store','data')
+    Output('aqueon-summary-fit-startdate','children'),
+    Output('aqueon-summary-fit-enddate','children'),
+    Output('aqueon-summary-fit-type','children'),
+    Output('aqueon-summary-fit-backtest-enddate','children'),
+    Output('etl_oil_cum','children'),
+    Output('etl_water_cum','children'),
+    Output('etl_gas_cum','children'),
+    Output('etl_injectant_cum','children'),
+    Output('etl_date_range','children'),
+    Input('case_name_store','data'),
 )
-def update_badge_layers_wells(data):
+def update_case_overview(data):
     case_name = data['case_name']
-    completiondata = aqueon.completiondata
-    
-    #005-count_layer_fb_comp
-    query = PostgreSQLQuery.from_(
-        completiondata
-    ).select(
-        fn.Count(distinct(
-            getattr(completiondata, 'Reservoir')
-        )).as_('total_layers'),
-        fn.Count(distinct(
-            getattr(completiondata, 'FaultBlock')
-        )).as_('total_faultblocks'),
-        fn.Count(distinct(
-            getattr(completiondata, 'Compartment')
-        )).as_('total_compartments'),
-    ).where(getattr(completiondata, 'casename') == case_name)
-    
-
-    query_str = query.get_sql()
-    
-    #raise PreventUpdate
-    with httpx.Client(timeout=30) as client:
-        response = client.post(
-            f'{api_url}/dataexplorer/query/tachyus',
-            headers=headers,
-            data=query_str
-        )
-        
-    if response.status_code == 200:
-        data = response.json()
-        n_layers = data[0]['total_layers']
-        n_faultblocks = data[0]['total_faultblocks']
-        n_compartments = data[0]['total_compartments']
-    else:
-        print(response.status_code,response.text)
-        raise PreventUpdate
-    return n_layers, n_faultblocks, n_compartments
+    overview = fetch_case_overview(case_name)
+    return [
+        overview['total_wells'],
+        overview['producer_wells'],
+        overview['injector_wells'],
+        overview['conversion_wells'],
+        overview['total_layers'],
+        overview['total_faultblocks'],
+        overview['total_compartments'],
+        overview['fit_startdate'],
+        overview['fit_enddate'],
+        overview['fit_type'],
+        overview['backtest_enddate'],
+        overview['oil_cum'],
+        overview['water_cum'],
+        overview['gas_cum'],
+        overview['injectant_cum'],
+        overview['date_range'],
+    ]
     
 # endregion
 
@@ -907,59 +793,6 @@ def toggle_edit_modal(n, is_open):
     return is_open
 # endregion
 
-# region fit info
-# ------------------------------- Fit info data ------------------------------ #
-@callback(
-    Output('aqueon-summary-fit-startdate','children'),
-    Output('aqueon-summary-fit-enddate','children'),
-    Output('aqueon-summary-fit-type','children'),
-    Output('aqueon-summary-fit-backtest-enddate','children'),
-    Input('case_name_store','data')
-)
-def update_fit_info(data):
-    case_name = data['case_name']
-    
-    #Table object
-    fit_info = aqueon.fit_info
-    
-    #009-fit_info.sql
-    query = PostgreSQLQuery.from_(
-        fit_info
-    ).select(
-        getattr(fit_info, 'FitStartDate').as_('fit_startdate'),
-        getattr(fit_info, 'FitEndDate').as_('fit_enddate'),
-        getattr(fit_info, 'IsBacktest').as_('is_backtest'),
-        getattr(fit_info, 'BacktestEndDate').as_('backtest_enddate'),
-        getattr(fit_info,'Dt').as_('dt')
-    ).where(
-        getattr(fit_info, 'casename') == case_name
-    ).limit(1)
-    
-    query_str = query.get_sql()
-    with httpx.Client(timeout=30) as client:
-        response = client.post(
-            f'{api_url}/dataexplorer/query/tachyus',
-            headers=headers,
-            data=query_str
-        )
-        
-    if response.status_code == 200:
-        data = response.json()
-        df = pd.DataFrame(data).squeeze()
-    else:
-        print(response.status_code,response.text)
-        raise PreventUpdate
-    
-    list_return = [
-        df['fit_startdate'][:10],
-        df['fit_enddate'][:10],
-        'BT' if df['is_backtest'] else 'FF',
-        df['backtest_enddate'][:10] if df['is_backtest'] else 'N/A'
-    ]
-    return list_return
-    
-# endregion
-
 # region Dropdown Callbacks
 # ---------------------------- Dropdown Callbacks ---------------------------- #
 
@@ -971,54 +804,10 @@ def update_fit_info(data):
 )
 def update_producers_injectors_dropdown(data):
     case_name = data['case_name']
-    #table object
-    productiondata = aqueon.productiondata
-    completiondata = aqueon.completiondata
-    
-    #007-producers_injectors_dropdown.sql
-    query_base = PostgreSQLQuery.from_(
-        productiondata
-    ).left_join(
-        aqueon.completiondata
-    ).on(
-        (productiondata.WellAPI == completiondata.WellAPI) &
-        (productiondata.casename == completiondata.casename)
-    ).where(
-        getattr(productiondata, 'casename') == case_name
-    )
-    
-    query_producers = query_base.where(
-        (getattr(productiondata, 'Qo') + getattr(productiondata, 'Qw') + getattr(productiondata, 'Qg')) > 0,
-    ).select(
-        getattr(completiondata, 'WellName'),
-        getattr(productiondata, 'WellAPI'),
-        getattr(productiondata, 'Status'),
-    ).distinct()
-    
-    query_injectors = query_base.where(
-        getattr(productiondata, 'Qs') > 0
-    ).select(
-        getattr(completiondata, 'WellName'),
-        getattr(productiondata, 'WellAPI'),
-        getattr(productiondata, 'Status')
-    ).distinct()
-    
-    query = query_producers + query_injectors
+    query = build_wells_dropdown_query(case_name)
     
     query_str = query.get_sql()
-    with httpx.Client(timeout=30) as client:
-        response = client.post(
-            f'{api_url}/dataexplorer/query/tachyus',
-            headers=headers,
-            data=query_str
-        )
-        
-    if response.status_code == 200:
-        data = response.json()
-        df = pd.DataFrame(data)
-    else:
-        print(response.status_code,response.text)
-        raise PreventUpdate
+    df = run_case_query(case_name, query_str)
     
     list_dropdowns = []
     
@@ -1036,49 +825,10 @@ def update_producers_injectors_dropdown(data):
 )
 def update_ly_fb_comp_dropdown(data):
     case_name = data['case_name']
-    #table object
-    completiondata = aqueon.completiondata
-    
-    #008-ly_fb_comp_dropdown.sql
-    query_base = PostgreSQLQuery.from_(
-        completiondata
-    ).where(
-        getattr(completiondata, 'casename') == case_name
-    )
-    
-    query_layer = query_base.select(
-        getattr(completiondata, 'Reservoir').as_('name'),
-        #add constant column
-        fn.LiteralValue("'layer'").as_('type')
-    ).distinct()
-    
-    query_faultblock = query_base.select(
-        getattr(completiondata, 'FaultBlock').as_('name'),
-        fn.LiteralValue("'faulblock'").as_('type')
-    ).distinct()
-    
-    query_compartment = query_base.select(
-        getattr(completiondata, 'Compartment').as_('name'),
-        fn.LiteralValue("'compartment'").as_('type')
-    ).distinct()
-    
-    
-    query = query_layer + query_faultblock + query_compartment
+    query = build_zones_dropdown_query(case_name)
     query_str = query.get_sql()
 
-    with httpx.Client(timeout=30) as client:
-        response = client.post(
-            f'{api_url}/dataexplorer/query/tachyus',
-            headers=headers,
-            data=query_str
-        )
-        
-    if response.status_code == 200:
-        data = response.json()
-        df = pd.DataFrame(data)
-    else:
-        print(response.status_code,response.text)
-        raise PreventUpdate
+    df = run_case_query(case_name, query_str)
     
     
     list_dropdowns = []
@@ -1094,43 +844,70 @@ def update_ly_fb_comp_dropdown(data):
 
 # endregion
 
+# region Filter Callbacks
+#The dropdowns are coalesced into one versioned filter snapshot after a debounce delay,
+#the figures of the summary tab depend on the snapshot instead of the dropdowns
+clientside_callback(
+    ClientsideFunction(namespace='filter_state', function_name='snapshot_filters'),
+    Output('summary_filter_store','data'),
+    Input('summary_settings_producers_dropdown','value'),
+    Input('summary_settings_injectors_dropdown','value'),
+    Input('summary_settings_layers_dropdown','value'),
+    Input('summary_settings_faultblocks_dropdown','value'),
+    Input('summary_settings_compartments_dropdown','value'),
+    State('summary_filter_debounce','data'),
+    State('summary_filter_tab','data'),
+    State('summary_filter_store','data')
+)
+# endregion
+
 # region Map Callbacks
 # ------------------------------- Map Callbacks ------------------------------ #
 @callback(
     Output('summary_map','figure'),
+    Output('summary_map_rendered','data'),
     Input('summary_map_accordion','active_item'),
     Input('case_name_store','data'),
-    Input('summary_settings_producers_dropdown','value'),
-    Input('summary_settings_injectors_dropdown','value'),
-    Input('summary_settings_layers_dropdown','value'),
-    Input('summary_settings_faultblocks_dropdown','value'),
-    Input('summary_settings_compartments_dropdown','value'),
+    Input('summary_filter_store','data'),
     Input('summarymap_settings_aggregation_checklist','value'),
     Input('summarymap_checkbox_wellpath','value'),
     Input('summarymap_checkbox_groupby','value'),
     Input('summary_settings_map_colormap','value'),
     Input('summary_settings_map_colormap_alpha','value'),
     Input('summarymap_checkbox_hideunselected','value'),
+    State('summary_map_rendered','data'),
 )
 def update_map(
     active_item,
     data,
-    prods,
-    injs,
-    layers,
-    fbs,
-    comps,
+    filters,
     agg,
     path,
     groupby,
     colormap,
     alpha,
-    hide_unselected
+    hide_unselected,
+    rendered
 ):
     
     if 'map' not in active_item:
         raise PreventUpdate
+    prods, injs, layers, fbs, comps = unpack_filters(filters)
+    scope = begin_request(filters, 'map')
     case_name = data['case_name']
+    #Everything the map depends on besides the selected wells
+    render_key = {
+        'case_name':case_name,
+        'layers':layers,
+        'fbs':fbs,
+        'comps':comps,
+        'agg':list(agg),
+        'path':path,
+        'groupby':groupby,
+        'colormap':colormap,
+        'alpha':alpha,
+        'hide_unselected':hide_unselected,
+    }
     #Table object
     completiondata = aqueon.completiondata
     
@@ -1186,43 +963,26 @@ def update_map(
         'FaultBlock':fbs
     }
     
-    #iterate over the filters and add them to the query
-    for k,f in filters_dict.items():
-        #check if the filter is not empty to add filter to the query
-        if len(f)>0:
-            query = query.where(
-                getattr(completiondata,k).isin(f)
-            )
+    #iterate over the filters and add them to the query, in canonical order
+    #so the same selection made in another order hits the query cache
+    for k,f in canonical_filters(filters_dict).items():
+        query = query.where(
+            getattr(completiondata,k).isin(f)
+        )
             
-    #check if wells are selected
-    if len(prods+injs)>0:
-        case_selected = Case().when(
-            getattr(completiondata, 'WellAPI').isin(prods+injs),True
-        ).else_(False).as_('is_selected')
-    else:
-        case_selected = fn.LiteralValue(False).as_('is_selected')
-    query = query.select(case_selected)
+    # get the query string and send it to the api,
+    # one row per completion is streamed in chunks up to the row cap
+    query_str = query.get_sql()
+    df = scope.result(submit_case_query(case_name, query_str, stream=not groupby))
+    drop_if_stale(scope)
     
-    #if hide unselected wells is checked add filter to the query
-    if hide_unselected and len(prods+injs)>0:
-        query = query.where(getattr(completiondata, 'WellAPI').isin(prods+injs))
+    #the selected wells are flagged here instead of in the query,
+    #so selecting wells is served by the query cache
+    df['is_selected'] = df['WellAPI'].isin(prods+injs)
     
-    # get the query string and send it to the api
-    query_str = query.get_sql()
-    with httpx.Client(timeout=30) as client:
-        response = client.post(
-            f'{api_url}/dataexplorer/query/tachyus',
-            headers=headers,
-            data=query_str
-        )
-        
-    if response.status_code == 200:
-        data = response.json()
-        df = pd.DataFrame(data)
-    else:
-        print(response.status_code,response.text)
-        print(query_str)
-        raise PreventUpdate
+    #if hide unselected wells is checked keep only the selected wells
+    if hide_unselected and len(prods+injs)>0:
+        df = df.loc[df['is_selected']]
     
     list_traces = []
 
@@ -1231,40 +991,81 @@ def update_map(
     path_bool = all([path, not groupby])
     agg_cols_if = ['WellAPI'] if path_bool else agg
     
-    #add the selected column to the aggregation columns
-    agg_cols_if.append('is_selected')
-    
     #group the data by the aggregation columns
     df_gr = df.groupby(agg_cols_if)
     ngroups = df_gr.ngroups
+    codes = df_gr.ngroup().to_numpy()
+    merged = merge_groups(ngroups)
+    
+    #when only the selected wells changed since the figure in the browser was drawn,
+    #the highlighted markers are patched on it instead of drawing it again
+    if rendered == render_key and not hide_unselected:
+        is_selected = df['is_selected'].to_numpy()
+        if merged:
+            markers = [selection_marker(is_selected, codes if path_bool else None)]
+        else:
+            markers = [selection_marker(is_selected[codes==i]) for i in range(ngroups)]
+        patched_figure = Patch()
+        for i, marker in enumerate(markers):
+            patched_figure['data'][i]['marker']['size'] = marker['size']
+            patched_figure['data'][i]['marker']['line'] = marker['line']
+        return patched_figure, no_update
     
     #get the colormap
     cmap = get_cmap(colormap,ngroups)
     
-    # iterate over the groups and create the traces
-    for i,(labels, dfi) in enumerate(df_gr):
-        is_selected = labels[-1]
-        
-        trace = go.Scatter(
-            x = dfi['Longitude'],
-            y = dfi['Latitude'],
+    #hover labels of every well, built once for all the groups
+    text = hover_text(df, ['WellName']+agg_cols_if)
+    
+    #many groups are merged in one WebGL trace with a color per point
+    if merged:
+        colors = group_colors(codes, [f'rgba{cmap(i,alpha)}' for i in range(ngroups)])
+        x = df['Longitude'].to_numpy()
+        y = df['Latitude'].to_numpy()
+        t = text.to_numpy()
+        wells = df['WellAPI'].to_numpy()
+        #one line per well when the well paths are drawn
+        if path_bool:
+            x, y, colors, t, wells = break_between_groups(codes, x, y, colors, t, wells)
+        trace = go.Scattergl(
+            x = x,
+            y = y,
             mode = 'lines+markers' if path_bool else 'markers',
-            name='-'.join(map(str,labels)),
-            text = dfi.loc[:,['WellName']+agg_cols_if[:-1]].apply(lambda x: '<br>'.join([f'{i}: {j}' for i,j in x.items()]),axis=1),
+            name = 'wells',
+            text = t,
             hovertemplate='<b>%{text}</b><br><br>',
-            customdata=dfi['WellAPI'],
-            #opacity=alpha if is_selected else 0.4,
+            customdata=wells,
+            showlegend=False,
+            line={
+                'color':'rgba(128,128,128,0.5)',
+                'width':1,
+            },
             marker={
-                'color':f'rgba{cmap(i,alpha)}',
-                'size':10 if is_selected else 5,
-                'line':{
-                    'color':'black' if is_selected else 'white',
-                    'width':1 if is_selected else 0.5,
-                }
+                'color':colors,
+                **selection_marker(df['is_selected'], codes if path_bool else None)
             }
         )
         list_traces.append(trace)
-        #print(len(list_traces))
+    else:
+        # iterate over the groups and create the traces
+        trace_type = scatter_type(len(df))
+        for i,(labels, dfi) in enumerate(df_gr):
+            trace = trace_type(
+                x = dfi['Longitude'],
+                y = dfi['Latitude'],
+                mode = 'lines+markers' if path_bool else 'markers',
+                name='-'.join(map(str,labels)),
+                text = text.loc[dfi.index],
+                hovertemplate='<b>%{text}</b><br><br>',
+                customdata=dfi['WellAPI'],
+                #opacity=alpha if is_selected else 0.4,
+                marker={
+                    'color':f'rgba{cmap(i,alpha)}',
+                    **selection_marker(dfi['is_selected'])
+                }
+            )
+            list_traces.append(trace)
+            #print(len(list_traces))
     
     #create the layout
     layout = go.Layout(
@@ -1291,7 +1092,7 @@ def update_map(
     return {
         'data': list_traces,
         'layout': layout
-    }
+    }, render_key
 
 # Map selection callback
 @callback(
@@ -1376,11 +1177,7 @@ def func_plot_data_fit(phase):
     def func(
         active_phase,
         data,
-        prods,
-        injs,
-        layers,
-        fbs,
-        comps,
+        filters,
         agg,
         second_props,
         show_fit,
@@ -1400,301 +1197,76 @@ def func_plot_data_fit(phase):
         fit_line_color,
         fit_line_alpha,
         colormap,
-        colormap_alpha
+        colormap_alpha,
+        relayout_data
     ):
         
         if active_phase != phase:
             raise PreventUpdate
+        #only a new x range or an x autorange reset is fetched again, autosize, y zooms
+        #and dragmode or legend edits keep the figure
+        x_changed = relayout_x_range(relayout_data) is not None or 'xaxis.autorange' in (relayout_data or {})
+        if ctx.triggered_id == f'summary_plot_{phase}' and not x_changed:
+            raise PreventUpdate
+        prods, injs, layers, fbs, comps = unpack_filters(filters)
+        #a newer run of this plot cancels the queries of this one
+        scope = begin_request(filters, f'phase_{phase}')
         
-        case_name = data['case_name']
-        #Table object
-        productiondata = aqueon.productiondata
-        completiondata = aqueon.completiondata
-        producer_timestep = aqueon.producer_timestep
-        injector_timestep = aqueon.injector_timestep
-        fit_info = aqueon.fit_info
-        
-        #make the date column
-        date_col = make_date(
-            getattr(productiondata, 'Year'),
-            getattr(productiondata, 'Month'),
-            1
-        ).as_('date')
-        
-        #010-real_production_data_base.sql    
-        status = 1 if phase != 'injectant' else 2
-        query_real_base = PostgreSQLQuery.from_(
-            productiondata     
-        ).where(
-            getattr(productiondata, 'casename') == case_name
-        ).where(
-            getattr(productiondata,'Status') == status
-        ).left_join(
-            completiondata
-        ).on(
-            (productiondata.WellAPI == completiondata.WellAPI) &
-            (productiondata.casename == completiondata.casename) &
-            (productiondata.CompSubId == completiondata.CompSubId)
-        )
+        #zoomed window of the plot, it is drawn at full resolution
+        x_range = relayout_x_range(relayout_data)
         
-        # If there's no aggregation just group by date
-        if len(agg)==0:
-            gr_cols_real = ['field']
-            if phase == 'gross':
-                query_real = query_real_base.select(
-                    date_col,
-                    fn.LiteralValue("'field'").as_('field'),
-                    fn.Sum(getattr(productiondata, phases_dict['oil']['db_column']) + getattr(productiondata, phases_dict['water']['db_column'])).as_(phase),
-                    fn.Count(distinct(getattr(productiondata, 'WellAPI'))).as_('wellcount'),
-                    fn.Avg(getattr(productiondata,'BHP')).as_('bhp')
-                ).groupby(
-                    date_col
-                ).orderby(
-                    date_col
-                )
-            else:
-                query_real = query_real_base.select(
-                    date_col,
-                    fn.LiteralValue("'field'").as_('field'),
-                    fn.Sum(getattr(productiondata, phases_dict[phase]['db_column'])).as_(phase),
-                    fn.Count(distinct(getattr(productiondata, 'WellAPI'))).as_('wellcount'),
-                    fn.Avg(getattr(productiondata,'BHP')).as_('bhp')
-                ).groupby(
-                    date_col
-                ).orderby(
-                    date_col
-                )
-        #if there's aggregation like reservoir, wells, etc, group by date and aggregation
-        else:
-            agg_cols = [getattr(completiondata,i) for i in agg]
-            gr_cols_real = agg
-            if phase == 'gross':
-                query_real = query_real_base.select(
-                    date_col,
-                    *agg_cols,
-                    fn.Sum(getattr(productiondata, phases_dict['oil']['db_column']) + getattr(productiondata, phases_dict['water']['db_column'])).as_(phase),
-                    #fn.Count(distinct(getattr(productiondata, 'WellAPI'))).as_('wellcount'),
-                    #fn.Avg(getattr(productiondata,'BHP')).as_('bhp')
-                ).groupby(
-                    date_col,
-                    *agg_cols
-                ).orderby(
-                    *agg_cols,
-                    date_col
-                )
-            else:
-                query_real = query_real_base.select(
-                    date_col,
-                    *agg_cols,
-                    fn.Sum(getattr(productiondata, phases_dict[phase]['db_column'])).as_(phase),
-                    #fn.Count(distinct(getattr(productiondata, 'WellAPI'))).as_('wellcount'),
-                    #fn.Avg(getattr(productiondata,'BHP')).as_('bhp')
-                ).groupby(
-                    date_col,
-                    *agg_cols
-                ).orderby(
-                    *agg_cols,
-                    date_col
-                )
-            
-        #fit query base
+        case_name = data['case_name']
         
-        if show_fit:
-            p_lower, p_upper = fit_percentiles.split('-')
-            fit_timestep = injector_timestep if phase=='injectant' else producer_timestep
-            query_fit_base = PostgreSQLQuery.from_(
-                fit_timestep    
-            ).where(
-                getattr(fit_timestep, 'casename') == case_name
-            ).left_join(
-                completiondata
-            ).on(
-                (fit_timestep.WellId == completiondata.WellAPI) &
-                (fit_timestep.casename == completiondata.casename) &
-                (fn.Cast(fit_timestep.CompletionId,'INTEGER') == fn.Cast(completiondata.CompSubId,'INTEGER'))
-            ).left_join(
-                fit_info
-            ).on(
-                fit_timestep.casename == fit_info.casename
-            )
-            
-            # If there's no aggregation just group by date
-            
-            case_clause = Case().when(
-                getattr(fit_info,'IsBacktest') == True,
-                Case()
-                    .when(getattr(fit_info,'BacktestEndDate') >= getattr(fit_timestep, 'Date'),'training')
-                    .else_('validation')
-                ).else_('training').as_('type_of_fit')
-            
-            if len(agg)==0:
-                gr_cols_fit = ['field']
-                
-                # make the query if the phase is water
-                if phase=='water':
-                    query_fit = query_fit_base.select(
-                        getattr(producer_timestep, 'Date').as_('date'),
-                        fn.LiteralValue("'field'").as_('field'),
-                        case_clause,
-                        fn.Sum(
-                            getattr(producer_timestep, f'GrossRateP50') - getattr(producer_timestep, f'OilRateP50')
-                        ).as_(f'{phase}_rate_p50'),
-                        fn.Sum(
-                            getattr(producer_timestep, f'GrossRateP{p_lower}') - getattr(producer_timestep, f'OilRateP{p_lower}')
-                        ).as_(f'{phase}_rate_p{p_lower}'),
-                        fn.Sum(
-                            getattr(producer_timestep, f'GrossRateP{p_upper}')-getattr(producer_timestep, f'OilRateP{p_upper}')
-                        ).as_(f'{phase}_rate_p{p_upper}'),
-                    ).groupby(
-                        getattr(producer_timestep, 'Date').as_('date'),case_clause
-                    ).orderby(
-                        getattr(producer_timestep, 'Date').as_('date'),
-                    )
-                elif phase=='injectant':
-                    query_fit = query_fit_base.select(
-                        getattr(injector_timestep, 'Date').as_('date'),
-                        fn.LiteralValue("'field'").as_('field'),
-                        case_clause,
-                        fn.Sum(getattr(injector_timestep, f'{phase.capitalize()}RateP50')).as_(f'{phase}_rate_p50'),
-                        fn.Sum(getattr(injector_timestep, f'{phase.capitalize()}RateP{p_lower}')).as_(f'{phase}_rate_p{p_lower}'),
-                        fn.Sum(getattr(injector_timestep, f'{phase.capitalize()}RateP{p_upper}')).as_(f'{phase}_rate_p{p_upper}'),
-                    ).groupby(
-                        getattr(injector_timestep, 'Date').as_('date'),case_clause
-                    ).orderby(
-                        getattr(injector_timestep, 'Date').as_('date'),
-                    )
-                else:
-                    query_fit = query_fit_base.select(
-                        getattr(producer_timestep, 'Date').as_('date'),
-                        fn.LiteralValue("'field'").as_('field'),
-                        case_clause,
-                        fn.Sum(getattr(producer_timestep, f'{phase.capitalize()}RateP50')).as_(f'{phase}_rate_p50'),
-                        fn.Sum(getattr(producer_timestep, f'{phase.capitalize()}RateP{p_lower}')).as_(f'{phase}_rate_p{p_lower}'),
-                        fn.Sum(getattr(producer_timestep, f'{phase.capitalize()}RateP{p_upper}')).as_(f'{phase}_rate_p{p_upper}'),
-                    ).groupby(
-                        getattr(producer_timestep, 'Date').as_('date'),case_clause
-                    ).orderby(
-                        getattr(producer_timestep, 'Date').as_('date'),
-                    )
-            #if there's aggregation like reservoir, wells, etc, group by date and aggregation
-            else:
-                agg_cols = [getattr(completiondata,i) for i in agg]
-                #gr_cols_fit = [*agg,'type_of_fit']
-                gr_cols_fit = agg
-                
-                if phase=='water':
-                    query_fit = query_fit_base.select(
-                        getattr(producer_timestep, 'Date').as_('date'),
-                        *agg_cols,
-                        case_clause,
-                        fn.Sum(
-                            getattr(producer_timestep, f'GrossRateP50') - getattr(producer_timestep, f'OilRateP50')
-                        ).as_(f'{phase}_rate_p50'),
-                        fn.Sum(
-                            getattr(producer_timestep, f'GrossRateP{p_lower}') - getattr(producer_timestep, f'OilRateP{p_lower}')
-                        ).as_(f'{phase}_rate_p{p_lower}'),
-                        fn.Sum(
-                            getattr(producer_timestep, f'GrossRateP{p_upper}')-getattr(producer_timestep, f'OilRateP{p_upper}')
-                        ).as_(f'{phase}_rate_p{p_upper}'),
-                    ).groupby(
-                        getattr(producer_timestep, 'Date').as_('date'),
-                        *agg_cols,
-                        case_clause
-                    ).orderby(
-                        *agg_cols,
-                        getattr(producer_timestep, 'Date').as_('date'),
-                    )
-                elif phase=='injectant':
-                    query_fit = query_fit_base.select(
-                        getattr(injector_timestep, 'Date').as_('date'),
-                        *agg_cols,
-                        case_clause,
-                        fn.Sum(getattr(injector_timestep, f'{phase.capitalize()}RateP50')).as_(f'{phase}_rate_p50'),
-                        fn.Sum(getattr(injector_timestep, f'{phase.capitalize()}RateP{p_lower}')).as_(f'{phase}_rate_p{p_lower}'),
-                        fn.Sum(getattr(injector_timestep, f'{phase.capitalize()}RateP{p_upper}')).as_(f'{phase}_rate_p{p_upper}'),
-                    ).groupby(
-                        getattr(injector_timestep, 'Date').as_('date'),
-                        *agg_cols,
-                        case_clause
-                    ).orderby(
-                        *agg_cols,
-                        getattr(injector_timestep, 'Date').as_('date'),
-                    )                    
-                else:
-                    query_fit = query_fit_base.select(
-                        getattr(producer_timestep, 'Date').as_('date'),
-                        *agg_cols,
-                        case_clause,
-                        fn.Sum(getattr(producer_timestep, f'{phase.capitalize()}RateP50')).as_(f'{phase}_rate_p50'),
-                        fn.Sum(getattr(producer_timestep, f'{phase.capitalize()}RateP{p_lower}')).as_(f'{phase}_rate_p{p_lower}'),
-                        fn.Sum(getattr(producer_timestep, f'{phase.capitalize()}RateP{p_upper}')).as_(f'{phase}_rate_p{p_upper}'),
-                    ).groupby(
-                        getattr(producer_timestep, 'Date').as_('date'),
-                        *agg_cols,
-                        case_clause
-                    ).orderby(
-                        *agg_cols,
-                        getattr(producer_timestep, 'Date').as_('date'),
-                    )
-                
-        #If there are filters add them to the query
+        #If there are filters add them to the queries
         filters_dict = {
             'WellAPI':prods+injs,
             'Reservoir':layers,
             'Compartment':comps,
             'FaultBlock':fbs
         }
-        #iterate over the filters and add them to the query
-        for k,f in filters_dict.items():
-            #check if the filter is not empty to add filter to the query
-            if len(f)>0:
-                query_real = query_real.where(
-                    getattr(completiondata,k).isin(f)
-                )
-                if show_fit:
-                    query_fit = query_fit.where(
-                        getattr(completiondata,k).isin(f)
-                    )
-                    
-        # Call to the API    
-        with httpx.Client(timeout=30) as client:
-            query_real_str = query_real.get_sql()
-            response_real = client.post(
-                f'{api_url}/dataexplorer/query/tachyus',
-                headers=headers,
-                data=query_real_str
-            )
-            
-            #If show fit is true, call the fit query
-            if show_fit:
-                query_fit_str = query_fit.get_sql()
-
-                response_fit = client.post(
-                    f'{api_url}/dataexplorer/query/tachyus',
-                    headers=headers,
-                    data=query_fit_str
-                )
-        #If the response is 200 of real data, create the dataframe
-        if response_real.status_code == 200:
-            data_real = response_real.json()
-            df_real = pd.DataFrame(data_real)
-            df_real = df_real.fillna('NA')
-            df_real['date'] = pd.to_datetime(df_real['date'],format='%Y-%m-%d',exact=False)
-        else:
-            print(response_real.status_code)
-            print(response_real.text)
         
-        #If the response is 200 of fit data, create the dataframe
+        #In the windowed fetch mode the whole history comes at a coarse resolution
+        #and the months of the zoomed years are fetched on relayout
+        resolution = series_resolution()
+        
+        #010-real_production_data_base.sql
+        #every phase plot shares the same query, so switching phases is served by the query cache
+        query_real_str = production_sql(case_name, agg, filters_dict, resolution)
+        gr_cols_real = agg if len(agg)>0 else ['field']
+        gr_cols_fit = agg if len(agg)>0 else ['field']
+        
+        # Call to the API, both queries are sent at once
+        #Well level series grow with the field, they are streamed up to the row cap
+        #the local engine reads the rollup tables of the case when one matches the aggregation
+        stream = 'WellAPI' in agg
+        pending_real = scope.watch(submit_case_query(
+            case_name, query_real_str, stream=stream, local_query=rollup_sql(agg, filters_dict, resolution)
+        ))
+        
+        #If show fit is true, call the fit query
         if show_fit:
-            if response_fit.status_code == 200:
-                data_fit = response_fit.json()
-                df_fit = pd.DataFrame(data_fit)
-                df_fit = df_fit.fillna('NA')
-                df_fit['date'] = pd.to_datetime(df_fit['date'],format='%Y-%m-%d',exact=False)
-            else:
-                print(response_fit.status_code)
-                print(response_fit.text)
-                raise PreventUpdate
+            p_lower, p_upper = fit_percentiles.split('-')
+            query_fit_str = fit_sql(case_name, phase, agg, filters_dict, fit_percentiles, resolution)
+            pending_fit = scope.watch(submit_case_query(case_name, query_fit_str))
+
+        #The actual traces are built while the fit query is still running
+        df_real = scope.result(pending_real)
+        drop_if_stale(scope)
+        df_real['date'] = pd.to_datetime(df_real['date'],format='%Y-%m-%d',exact=False)
+        if resolution is not None:
+            df_real = refine_window(
+                df_real, query_real_str, x_range, gr_cols_real,
+                lambda window: scope.watch(submit_case_query(
+                    case_name, production_sql(case_name, agg, filters_dict, window=window), stream=stream,
+                    local_query=rollup_sql(agg, filters_dict, window=window)
+                )),
+                scope.result
+            )
+            drop_if_stale(scope)
+        #the data comes in field units, it's converted before the missing values are labelled
+        quantity = phase_quantities[phase]
+        df_real = convert_units(select_phase(df_real, phase), {phase:quantity, **property_quantities}, units)
+        df_real = df_real.fillna('NA')
 
         # Create the Traces of the plot
         list_traces = []
@@ -1706,11 +1278,11 @@ def func_plot_data_fit(phase):
             actual_rgba = hex_to_rgba_str(actual_color,actual_alpha)
             list_rgba.append(actual_rgba)
         else:
-            cmap = get_cmap(colormap,gr_ngroups)
-            rgba_colors = ["rgba({},{},{},{})".format(*cmap(i,alpha=colormap_alpha)) for i in range(gr_ngroups)]
-            list_rgba.extend(rgba_colors)
+            list_rgba.extend(colormap_colors(colormap,gr_ngroups,colormap_alpha))
                             
         for i,(labels, dfi) in enumerate(gr_group):
+            #long series are downsampled to the point budget outside the zoomed window
+            dfi = downsample_frame(dfi, 'date', phase, x_range)
             trace = go.Scatter(
                 x = dfi['date'],
                 y = dfi[phase],
@@ -1718,6 +1290,8 @@ def func_plot_data_fit(phase):
                 name='-'.join(labels),
                 hoverinfo='x+y+text',
                 text = '-'.join(labels),
+                #read by the clientside restyling in assets/plot_style.js
+                meta = {'role':'actual','group':i,'ngroups':gr_ngroups,'unit_factors':unit_factors(quantity)},
                 line = {
                     'width':actual_width,
                     'dash':actual_linestyle,
@@ -1736,6 +1310,10 @@ def func_plot_data_fit(phase):
                         name = '-'.join(labels) + f' {prop}',
                         hoverinfo= 'x+y',
                         yaxis = 'y2',
+                        meta = {
+                            'role':'second','group':i,'ngroups':gr_ngroups,
+                            'unit_factors':unit_factors(property_quantities.get(prop))
+                        },
                         line = {
                             'width':1,
                             'dash':'solid',
@@ -1747,6 +1325,21 @@ def func_plot_data_fit(phase):
             
             
         if show_fit:
+            df_fit = scope.result(pending_fit)
+            drop_if_stale(scope)
+            df_fit['date'] = pd.to_datetime(df_fit['date'],format='%Y-%m-%d',exact=False)
+            if resolution is not None:
+                df_fit = refine_window(
+                    df_fit, query_fit_str, x_range, gr_cols_fit+['type_of_fit'],
+                    lambda window: scope.watch(submit_case_query(
+                        case_name, fit_sql(case_name, phase, agg, filters_dict, fit_percentiles, window=window)
+                    )),
+                    scope.result
+                )
+                drop_if_stale(scope)
+            fit_rates = {c:quantity for c in df_fit.columns if c.startswith(f'{phase}_rate_p')}
+            df_fit = convert_units(df_fit, fit_rates, units).fillna('NA')
+
             dict_color_type_fit = {
                 'training':{
                     'color':fit_training_color,
@@ -1760,14 +1353,18 @@ def func_plot_data_fit(phase):
             gr_group_fit = df_fit.groupby(gr_cols_fit)
             gr_ngroups_fit = gr_group_fit.ngroups
 
-            cmap_fit = get_cmap(colormap,gr_ngroups_fit)
+            cmap_fit = {
+                'training':colormap_colors(colormap,gr_ngroups_fit,fit_training_alpha),
+                'validation':colormap_colors(colormap,gr_ngroups_fit,fit_validation_alpha)
+            }
                         
             for i,(labels, dfi_agg_fit) in enumerate(gr_group_fit):
                 color_type_fit_dict = {
-                    'training': f'rgba{cmap_fit(i,alpha=fit_training_alpha)}',
-                    'validation': f'rgba{cmap_fit(i,alpha=fit_validation_alpha)}'
+                    'training': cmap_fit['training'][i],
+                    'validation': cmap_fit['validation'][i]
                 }
                 for type_fit, dfi_fit in dfi_agg_fit.groupby('type_of_fit'):
+                    dfi_fit = downsample_frame(dfi_fit, 'date', f'{phase}_rate_p{p_upper}', x_range)
                     x_fit = np.concatenate([
                             dfi_fit['date'].values,
                             dfi_fit['date'].values[::-1]
@@ -1791,10 +1388,22 @@ def func_plot_data_fit(phase):
                         fillcolor=fit_rgba if gr_ngroups_fit==1 else color_type_fit_dict[type_fit],
                         line_color=fit_linecolor_rgba,
                         showlegend=False,
+                        meta = {
+                            'role':'fit','type_of_fit':type_fit,'group':i,'ngroups':gr_ngroups_fit,
+                            'unit_factors':unit_factors(quantity)
+                        },
                     )
                     list_traces.append(trace_shadow)
                 
         
+        #axis titles of every unit system, for the clientside conversion of the units radio
+        unit_titles = {
+            u:{
+                'y':unit_title(f'{phase.capitalize()} Rate', quantity, u),
+                'y2':'-'.join(unit_title(prop, property_quantities.get(prop), u) for prop in second_props),
+            }
+            for u in unit_factors(quantity)
+        }
         layout = go.Layout(
             title = f'{phase.capitalize()} Fit',
             xaxis = {
@@ -1833,19 +1442,27 @@ def func_plot_data_fit(phase):
                 ),
             },
             yaxis = {
-                'title':f'{phase.capitalize()} Rate',
-                'type':y_scale
+                'title':unit_titles[units]['y'],
+                'type':y_scale,
+                #a new scale or new units reset the y range, the rest of the zoom survives restyling
+                'uirevision':f'{y_scale}-{units}'
             },
             yaxis2 = {
-                'title':'-'.join(second_props),
+                'title':unit_titles[units]['y2'],
                 'anchor':'x',
                 'overlaying':'y',
                 'side':'right',
+                'uirevision':units,
             },
             margin={'l': 50, 'b': 50, 't': 50, 'r': 50},
             showlegend=True if gr_ngroups<20 else False,
             legend={'orientation':'h','yanchor':'bottom','y':-0.3, 'xanchor':'right','x':1},
+            uirevision=case_name,
+            meta = {'units':units,'unit_titles':unit_titles},
         )
+        #keep the zoom of the user on the redrawn figure
+        if x_range is not None:
+            layout.xaxis.range = [str(x_range[0]), str(x_range[1])]
         return {
             'data': list_traces,
             'layout': layout
@@ -1858,32 +1475,68 @@ for p in phases_dict:
         Output(f'summary_plot_{p}','figure'),
         Input('summary_plot_accordion','active_item'),
         Input('case_name_store','data'),
-        Input('summary_settings_producers_dropdown','value'),
-        Input('summary_settings_injectors_dropdown','value'),
-        Input('summary_settings_layers_dropdown','value'),
-        Input('summary_settings_faultblocks_dropdown','value'),
-        Input('summary_settings_compartments_dropdown','value'),
+        Input('summary_filter_store','data'),
         Input('summary_settings_aggregation_checklist','value'),
         Input('summary_bhp_or_wellcount_switch','value'),
         Input('summary_settings_show_fit','value'),
+        State(f'summary_settings_{p}_yscale','value'),
+        State(f'summary_settings_{p}_units','value'),
+        State(f'summary_settings_{p}_actual_linestyle','value'),
+        State(f'summary_settings_{p}_actual_width','value'),
+        State(f'summary_settings_{p}_actual_shape','value'),
+        State(f'summary_settings_{p}_actual_mode','value'),
+        State(f'summary_settings_{p}_actual_color','value'),
+        State(f'summary_settings_{p}_actual_alpha','value'),
+        Input(f'summary_settings_{p}_fit_percentiles','value'),
+        State(f'summary_settings_{p}_fit_training_color','value'),
+        State(f'summary_settings_{p}_fit_training_alpha','value'),
+        State(f'summary_settings_{p}_fit_validation_color','value'),
+        State(f'summary_settings_{p}_fit_validation_alpha','value'),
+        State(f'summary_settings_{p}_fit_line_color','value'),
+        State(f'summary_settings_{p}_fit_line_alpha','value'),
+        State(f'summary_settings_{p}_colormap','value'),
+        State(f'summary_settings_{p}_colormap_alpha','value'),
+        Input(f'summary_plot_{p}','relayoutData')
+    )(func_plot_data_fit(p))
+
+#Appearance settings restyle the figure in the browser, the data isn't queried again.
+#The colormap is sampled on the server since the colormaps come from matplotlib.
+for p in phases_dict:
+    callback(
+        Output(f'summary_settings_{p}_colormap_samples','data'),
+        Input(f'summary_settings_{p}_colormap','value')
+    )(colormap_samples)
+    
+    clientside_callback(
+        ClientsideFunction(namespace='plot_style', function_name='restyle_phase_plot'),
+        Output(f'summary_plot_{p}','figure',allow_duplicate=True),
         Input(f'summary_settings_{p}_yscale','value'),
-        Input(f'summary_settings_{p}_units','value'),
         Input(f'summary_settings_{p}_actual_linestyle','value'),
         Input(f'summary_settings_{p}_actual_width','value'),
         Input(f'summary_settings_{p}_actual_shape','value'),
         Input(f'summary_settings_{p}_actual_mode','value'),
         Input(f'summary_settings_{p}_actual_color','value'),
         Input(f'summary_settings_{p}_actual_alpha','value'),
-        Input(f'summary_settings_{p}_fit_percentiles','value'),
         Input(f'summary_settings_{p}_fit_training_color','value'),
         Input(f'summary_settings_{p}_fit_training_alpha','value'),
         Input(f'summary_settings_{p}_fit_validation_color','value'),
         Input(f'summary_settings_{p}_fit_validation_alpha','value'),
         Input(f'summary_settings_{p}_fit_line_color','value'),
         Input(f'summary_settings_{p}_fit_line_alpha','value'),
-        Input(f'summary_settings_{p}_colormap','value'),
-        Input(f'summary_settings_{p}_colormap_alpha','value')
-    )(func_plot_data_fit(p))
+        Input(f'summary_settings_{p}_colormap_samples','data'),
+        Input(f'summary_settings_{p}_colormap_alpha','value'),
+        State(f'summary_plot_{p}','figure'),
+        prevent_initial_call=True
+    )
+    
+    #the units radio converts the values already in the figure, nothing is queried again
+    clientside_callback(
+        ClientsideFunction(namespace='plot_style', function_name='convert_units'),
+        Output(f'summary_plot_{p}','figure',allow_duplicate=True),
+        Input(f'summary_settings_{p}_units','value'),
+        State(f'summary_plot_{p}','figure'),
+        prevent_initial_call=True
+    )
 # endregion
     
 # region Crossplot Callbacks
@@ -1892,11 +1545,7 @@ for p in phases_dict:
     Output('summary_crossplot','figure'),
     Input('summary_map_accordion','active_item'),
     Input('case_name_store','data'),
-    Input('summary_settings_producers_dropdown','value'),
-    Input('summary_settings_injectors_dropdown','value'),
-    Input('summary_settings_layers_dropdown','value'),
-    Input('summary_settings_faultblocks_dropdown','value'),
-    Input('summary_settings_compartments_dropdown','value'),
+    Input('summary_filter_store','data'),
     Input('summarycrossplot_settings_aggregation_checklist','value'),
     Input('summarycrossplot_settings_hue_checklist','value'),
     Input('summary_plot_accordion','active_item'),
@@ -1908,11 +1557,7 @@ for p in phases_dict:
 def update_summary_cross_plot(
     active_item,
     data,
-    prods,
-    injs,
-    layers,
-    fbs,
-    comps,
+    filters,
     agg,
     hue,
     phase,
@@ -1926,193 +1571,31 @@ def update_summary_cross_plot(
     
     if phase is None:
         raise PreventUpdate
+    prods, injs, layers, fbs, comps = unpack_filters(filters)
+    scope = begin_request(filters, 'crossplot')
     
     hue = [h for h in hue if h in agg]
     
     case_name = data['case_name']
-    #table objects
-    productiondata = aqueon.productiondata
-    completiondata = aqueon.completiondata
-    fit_info = aqueon.fit_info
-    producer_timestep = aqueon.producer_timestep
-    injector_timestep = aqueon.injector_timestep
-    
-    #make the date column
-    date_col = make_date(
-        getattr(productiondata, 'Year'),
-        getattr(productiondata, 'Month'),
-        1
-    ).as_('date')
-    
-    #actual query
-    query_actual_base = PostgreSQLQuery.from_(
-        productiondata
-    ).left_join(
-        completiondata
-    ).on(
-        (productiondata.WellAPI == completiondata.WellAPI) &
-        (productiondata.casename == completiondata.casename) &
-        (productiondata.CompSubId == completiondata.CompSubId)
-    ).left_join(
-        fit_info
-    ).on(
-        fit_info.casename == productiondata.casename
-    ).where(
-        getattr(productiondata, 'casename') == case_name
-    ).where(
-        getattr(fit_info,'BacktestEndDate') < date_col
-    )
-    
-    # if actual query has no aggregation
-    if len(agg)==0:
-        agg_cols = [getattr(completiondata,i) for i in ['WellAPI','WellName','Reservoir']]
-        join_agg = ['WellAPI','WellName','Reservoir']
-    else:
-        if include_wells:
-            agg_cols = [getattr(completiondata,i) for i in agg+['WellAPI','WellName']]
-            join_agg = agg+['WellAPI','WellName']
-        else:
-            agg_cols = [getattr(completiondata,i) for i in agg]
-            join_agg = agg.copy()
-    
-    join_agg = list(set(join_agg))
-    agg_cols = list(set(agg_cols))
-    
-    if phase == 'gross':
-        query_actual = query_actual_base.select(
-            *agg_cols,
-            fn.Sum(
-                (getattr(productiondata, phases_dict['oil']['db_column']) + getattr(productiondata, phases_dict['water']['db_column'])) * \
-                #fn.Extract(DatePart.day,date_trunc(DatePart.month,date_col) + Interval(months=1) - Interval(days=1)) * 1e-3
-                30.42 * 1e-3
-            ).as_(f'actual_{phase}'),
-            fn.Avg(getattr(completiondata,'Netpay')).as_('netpay')
-        ).groupby(
-            *agg_cols
-        )
-    else:
-        query_actual = query_actual_base.select(
-            *agg_cols,
-            fn.Sum(
-                getattr(productiondata, phases_dict[phase]['db_column']) * \
-                #fn.Extract(DatePart.day,date_trunc(DatePart.month,date_col) + Interval(months=1) - Interval(days=1)) * 1e-3
-                30.42 * 1e-3
-            ).as_(f'actual_{phase}'),
-            fn.Avg(getattr(completiondata,'Netpay')).as_('netpay')
-        ).groupby(
-            *agg_cols
-        )
-    
-    #fit query
-    fit_timestep = injector_timestep if phase=='injectant' else producer_timestep
-    query_fit_base = PostgreSQLQuery.from_(
-        fit_timestep
-    ).where(
-        getattr(fit_timestep, 'casename') == case_name
-    ).left_join(
-        completiondata
-    ).on(
-        (fit_timestep.WellId == completiondata.WellAPI) &
-        (fit_timestep.casename == completiondata.casename) &
-        (fn.Cast(fit_timestep.CompletionId,'INTEGER') == fn.Cast(completiondata.CompSubId,'INTEGER'))
-    ).left_join(
-        fit_info
-    ).on(
-        fit_timestep.casename == fit_info.casename
-    ).where(
-        getattr(fit_info,'BacktestEndDate') < getattr(fit_timestep, 'Date')
-    )
-    
-    if phase=='water':
-        query_fit = query_fit_base.select(
-            *agg_cols,
-            fn.Sum(
-                (getattr(fit_timestep, 'GrossRateP50') - getattr(fit_timestep, 'OilRateP50')) * \
-                #fn.Extract(DatePart.day,date_trunc(DatePart.month,getattr(fit_timestep,'Date')) + Interval(months=1) - Interval(days=1)) * 1e-3
-                30.42 * 1e-3
-            ).as_(f'fit_{phase}')
-        ).groupby(
-            *agg_cols
-        )
-    else:
-        query_fit = query_fit_base.select(
-            *agg_cols,
-            fn.Sum(
-                getattr(fit_timestep, f'{phase.capitalize()}RateP50') * \
-                #fn.Extract(DatePart.day,date_trunc(DatePart.month,getattr(fit_timestep,'Date')) + Interval(months=1) - Interval(days=1)) * 1e-3
-                30.42 * 1e-3
-            ).as_(f'fit_{phase}')
-        ).groupby(
-            *agg_cols
-        )
-        
     filters_dict = {
         'WellAPI':prods+injs,
         'Reservoir':layers,
         'Compartment':comps,
         'FaultBlock':fbs
     }
-    #iterate over the filters and add them to the query
-    for k,f in filters_dict.items():
-        #check if the filter is not empty to add filter to the query
-        if len(f)>0:
-            if hide_unselected:
-                query_actual = query_actual.where(
-                    getattr(completiondata,k).isin(f)
-                )
-        if len(f)>0:
-            if hide_unselected:
-                query_fit = query_fit.where(
-                    getattr(completiondata,k).isin(f)
-                )
-                
+    join_agg = crossplot_columns(agg, include_wells)
+    
+    #the actual and fit cumulatives are joined on the crossplot columns,
+    #restricted to the selection only when the unselected points are hidden
+    query_join_str = crossplot_sql(case_name, phase, agg, include_wells, filters_dict if hide_unselected else {})
+    df = scope.result(submit_case_query(case_name, query_join_str))
+    drop_if_stale(scope)
+    df['netpay'] = df['netpay'].astype(str)
+    
+    #the selected points are flagged here instead of in the query,
+    #so selecting wells is served by the query cache
     for k,f in filters_dict.items():
-        #print(f'k: {k} f: {f}')
-        if len(f)>0 and k in join_agg:
-            case_selected = Case().when(
-                getattr(completiondata,k).isin(f),True
-            ).else_(False).as_(f'{k}_selected') 
-            #print(f)
-        else:
-            case_selected = fn.LiteralValue(False).as_(f'{k}_selected')
-        
-        query_actual = query_actual.select(case_selected)
-            
-    query_join = PostgreSQLQuery.from_(
-        query_actual.as_('actual')
-    ).select(
-        *[getattr(query_actual.as_('actual'),i) for i in join_agg],
-        getattr(query_actual.as_('actual'),'WellAPI_selected'),
-        getattr(query_actual.as_('actual'),'Reservoir_selected'),
-        getattr(query_actual.as_('actual'),'FaultBlock_selected'),
-        getattr(query_actual.as_('actual'),'Compartment_selected'),
-        getattr(query_actual.as_('actual'),f'actual_{phase}'),
-        getattr(query_fit.as_('fit'),f'fit_{phase}'),
-        getattr(query_actual.as_('actual'),'netpay')
-    ).inner_join(
-        query_fit.as_('fit')
-    ).using(
-        *join_agg
-    )
-    #print(query_join.get_sql())
-    with httpx.Client(timeout=30) as client:
-        query_join_str = query_join.get_sql()
-        response_actual = client.post(
-            f'{api_url}/dataexplorer/query/tachyus',
-            headers=headers,
-            data=query_join_str
-        )
-        
-    #If the response is 200 of real data, create the dataframe
-    if response_actual.status_code == 200:
-        data = response_actual.json()
-        df = pd.DataFrame(data)
-        df['netpay'] = df['netpay'].astype(str)
-        #print(df.head())
-    else:
-        print(response_actual.status_code)
-        print(response_actual.text)
-        raise PreventUpdate
+        df[f'{k}_selected'] = df[k].isin(f) if len(f)>0 and k in join_agg else False
     
     #extract columns with selected filters
     selected_columns = [i for i in df.columns if i.endswith('_selected')]
@@ -2141,30 +1624,59 @@ def update_summary_cross_plot(
         list_rgba_colors = [f'rgba{get_cmap(colormap,ngroups)(i,alpha)}' for i in range(ngroups)]
     
     cols_to_hover = join_agg+['netpay']
-    
-    #iterate over the groups
-    for i,(labels,dfi) in enumerate(gr_df):
-        is_selected = labels[-1]       
-        rgba_color = list_rgba_colors[i]
-        trace = go.Scatter(
-            x = dfi[f'actual_{phase}'],
-            y = dfi[f'fit_{phase}'],
-            mode = 'markers',
-            name = str(labels),
-            text = dfi.loc[:,cols_to_hover].apply(lambda x: '<br>'.join(f"{col}: {val}" for col, val in x.items()), axis=1),
-            hovertemplate='%{text}<br>Actual Cum: %{x:.2f}<br>Fit Cum: %{y:.2f}<extra></extra>',
-            customdata = dfi[join_agg].to_dict('records'),
-            marker = {
-                'color':rgba_color,
-                'size':10 if is_selected else 5,
-                'symbol':'circle' if is_selected else 'circle-open',
-                'line':{
-                    #'color': 'orange' if is_selected else rgba_color,
-                    'width': 2 if is_selected else 1
+    text = hover_text(df, cols_to_hover)
+    
+    #many groups are merged in one WebGL trace per selection state
+    if merge_groups(ngroups):
+        codes = gr_df.ngroup().to_numpy()
+        colors = group_colors(codes, list_rgba_colors)
+        text = text.to_numpy()
+        records = np.array(df[join_agg].to_dict('records'), dtype=object)
+        for is_selected, idx in df.groupby('is_selected').indices.items():
+            trace = go.Scattergl(
+                x = df[f'actual_{phase}'].to_numpy()[idx],
+                y = df[f'fit_{phase}'].to_numpy()[idx],
+                mode = 'markers',
+                name = 'selected' if is_selected else 'not selected',
+                text = text[idx],
+                hovertemplate='%{text}<br>Actual Cum: %{x:.2f}<br>Fit Cum: %{y:.2f}<extra></extra>',
+                customdata = records[idx],
+                showlegend=False,
+                marker = {
+                    'color':colors[idx],
+                    'size':10 if is_selected else 5,
+                    'symbol':'circle' if is_selected else 'circle-open',
+                    'line':{
+                        'width': 2 if is_selected else 1
+                    }
                 }
-            }
-        )
-        list_traces.append(trace)
+            )
+            list_traces.append(trace)
+    else:
+        #iterate over the groups
+        trace_type = scatter_type(len(df))
+        for i,(labels,dfi) in enumerate(gr_df):
+            is_selected = labels[-1]       
+            rgba_color = list_rgba_colors[i]
+            trace = trace_type(
+                x = dfi[f'actual_{phase}'],
+                y = dfi[f'fit_{phase}'],
+                mode = 'markers',
+                name = str(labels),
+                text = text.loc[dfi.index],
+                hovertemplate='%{text}<br>Actual Cum: %{x:.2f}<br>Fit Cum: %{y:.2f}<extra></extra>',
+                customdata = dfi[join_agg].to_dict('records'),
+                marker = {
+                    'color':rgba_color,
+                    'size':10 if is_selected else 5,
+                    'symbol':'circle' if is_selected else 'circle-open',
+                    'line':{
+                        #'color': 'orange' if is_selected else rgba_color,
+                        'width': 2 if is_selected else 1
+                    }
+                }
+            )
+            list_traces.append(trace)
 
     #add a trace with the 1:1 line
     trace_unit_slope = go.Scatter(
@@ -2300,198 +1812,31 @@ def update_selection_from_crossplot(
 # endregion
 
 # region ETL Callbacks
-@callback(
-    Output('etl_oil_cum','children'),
-    Output('etl_water_cum','children'),
-    Output('etl_gas_cum','children'),
-    Output('etl_injectant_cum','children'),
-    Output('etl_date_range','children'),
-    Input('case_name_store','data')
-)
-def update_etl_oil_cum(data):
-    case_name = data['case_name']
-    
-    #table objects
-    productiondata = aqueon.productiondata
-
-    date_col = make_date(
-        getattr(productiondata, 'Year'),
-        getattr(productiondata, 'Month'),
-        1
-    ).as_('date')
-
-    query = PostgreSQLQuery.from_(
-        productiondata
-    ).select(
-        fn.Min(date_col).as_('min_date'),
-        fn.Max(date_col).as_('max_date'),
-        fn.Sum(
-            getattr(productiondata, phases_dict['oil']['db_column']) * \
-            fn.Extract(DatePart.day,date_trunc(DatePart.month,date_col) + Interval(months=1) - Interval(days=1)) * \
-            1e-6
-        ).as_('oil_cum'),
-        fn.Sum(
-            getattr(productiondata, phases_dict['water']['db_column']) * \
-            fn.Extract(DatePart.day,date_trunc(DatePart.month,date_col) + Interval(months=1) - Interval(days=1)) * \
-            1e-6
-        ).as_('water_cum'),
-        fn.Sum(
-            getattr(productiondata, phases_dict['gas']['db_column']) * \
-            fn.Extract(DatePart.day,date_trunc(DatePart.month,date_col) + Interval(months=1) - Interval(days=1)) * \
-            1e-6
-        ).as_('gas_cum'),
-        fn.Sum(
-            getattr(productiondata, phases_dict['injectant']['db_column']) * \
-            fn.Extract(DatePart.day,date_trunc(DatePart.month,date_col) + Interval(months=1) - Interval(days=1)) * \
-            1e-6
-        ).as_('injectant_cum')
-    ).where(
-        getattr(productiondata, 'casename') == case_name
-    ).limit(1)
-    
-    query_str = query.get_sql()
-    with httpx.Client(timeout=30) as client:
-        response = client.post(
-            f'{api_url}/dataexplorer/query/tachyus',
-            headers=headers,
-            data=query_str
-        )
-        
-    if response.status_code == 200:
-        data = response.json()
-        sr = pd.DataFrame(data)
-    else:
-        print(response.status_code)
-        print(response.text)
-        raise PreventUpdate
-    
-    # Date Range Cumulative
-    date_ranges = sr.at[0,'min_date'][:10] + ' to ' + sr.at[0,'max_date'][:10]
-    
-    #Cumulative values rounded to 2 decimals
-    cum_list = sr[['oil_cum','water_cum','gas_cum','injectant_cum']].round(2).squeeze().values.tolist()
-    return *cum_list,date_ranges
-
-@callback(
-    Output('etl_top_wells_producers','rowData'),
-    Output('etl_top_wells_producers','columnDefs'),
-    Input('case_name_store','data')
-)
-def update_etl_oil_cum(data):
-    case_name = data['case_name']
-    
-    #table objects
-    productiondata = aqueon.productiondata
-    completiondata = aqueon.completiondata
-
-    date_col = make_date(
-        getattr(productiondata, 'Year'),
-        getattr(productiondata, 'Month'),
-        1
-    ).as_('date')
-
-    sum_oil = fn.Sum(
-            getattr(productiondata, phases_dict['oil']['db_column']) * \
-            fn.Extract(DatePart.day,date_trunc(DatePart.month,date_col) + Interval(months=1) - Interval(days=1)) * \
-            1e-3
-    ).as_('oil_cum')
-    query = PostgreSQLQuery.from_(
-        productiondata
-    ).select(
-        getattr(completiondata,'WellName'),
-        sum_oil
-    ).where(
-        getattr(productiondata, 'casename') == case_name
-    ).left_join(
-        completiondata
-    ).on(
-        (productiondata.WellAPI == completiondata.WellAPI) &
-        (productiondata.casename == completiondata.casename) &
-        (productiondata.CompSubId == completiondata.CompSubId)
-    ).groupby(
-        getattr(completiondata,'WellName')
-    ).orderby(
-        sum_oil, order=Order.desc
-    ).limit(10)
-    
-    query_str = query.get_sql()
-    with httpx.Client(timeout=30) as client:
-        response = client.post(
-            f'{api_url}/dataexplorer/query/tachyus',
-            headers=headers,
-            data=query_str
-        )
-        
-    if response.status_code == 200:
-        data = response.json()
-        df = pd.DataFrame(data).round(2)
-    else:
-        print(response.status_code)
-        print(response.text)
-        raise PreventUpdate
+#a dimension or phase picked mounts the grid of its ranking
+def func_leaderboard_grid(title):
+    def func(dimension,phase):
+        return create_leaderboard_grid(title,dimension,phase)
+    return func
 
-    return df.to_dict('records'),[{'field':i,'headerName':i} for i in df.columns]
+for title in etl_leaderboards:
+    callback(
+        Output(f'etl_top_{title}_container','children'),
+        Input(f'etl_top_{title}_dimension','value'),
+        Input(f'etl_top_{title}_phase','value'),
+        prevent_initial_call=True
+    )(func_leaderboard_grid(title))
 
+#Pages of every leaderboard grid, the rankings of a case are computed once and cached
 @callback(
-    Output('etl_top_layers_producers','rowData'),
-    Output('etl_top_layers_producers','columnDefs'),
-    Input('case_name_store','data')
+    Output({'type':'etl_leaderboard','grid':MATCH,'dimension':MATCH,'phase':MATCH},'getRowsResponse'),
+    Input({'type':'etl_leaderboard','grid':MATCH,'dimension':MATCH,'phase':MATCH},'getRowsRequest'),
+    State('case_name_store','data')
 )
-def update_etl_oil_cum(data):
-    case_name = data['case_name']
-    
-    #table objects
-    productiondata = aqueon.productiondata
-    completiondata = aqueon.completiondata
-
-    date_col = make_date(
-        getattr(productiondata, 'Year'),
-        getattr(productiondata, 'Month'),
-        1
-    ).as_('date')
-
-    sum_oil = fn.Sum(
-            getattr(productiondata, phases_dict['oil']['db_column']) * \
-            fn.Extract(DatePart.day,date_trunc(DatePart.month,date_col) + Interval(months=1) - Interval(days=1)) * \
-            1e-3
-    ).as_('oil_cum')
-    
-    query = PostgreSQLQuery.from_(
-        productiondata
-    ).select(
-        getattr(completiondata,'Reservoir'),
-        sum_oil
-    ).where(
-        getattr(productiondata, 'casename') == case_name
-    ).left_join(
-        completiondata
-    ).on(
-        (productiondata.WellAPI == completiondata.WellAPI) &
-        (productiondata.casename == completiondata.casename) &
-        (productiondata.CompSubId == completiondata.CompSubId)
-    ).groupby(
-        getattr(completiondata,'Reservoir')
-    ).orderby(
-        sum_oil, order=Order.desc
-    ).limit(10)
-    
-    query_str = query.get_sql()
-    with httpx.Client(timeout=30) as client:
-        response = client.post(
-            f'{api_url}/dataexplorer/query/tachyus',
-            headers=headers,
-            data=query_str
-        )
-        
-    if response.status_code == 200:
-        data = response.json()
-        df = pd.DataFrame(data).round(2)
-    else:
-        print(response.status_code)
-        print(response.text)
+def update_etl_leaderboard(request,data):
+    if request is None:
         raise PreventUpdate
-
-    return df.to_dict('records'),[{'field':i,'headerName':i} for i in df.columns]
+    grid = ctx.triggered_id
+    return leaderboard_rows(data['case_name'],grid['dimension'],grid['phase'],request)
 # endregion
 
 # endregion
@@ -0,0 +1,196 @@
+# region Import Modules
+import os
+import time
+import uuid
+import threading
+import pyarrow as pa
+from .query_cache import QueryCache
+# endregion
+
+
+# region Arrow Serialization
+#Errors raised when a DataFrame can't be represented as an Arrow table
+arrow_errors = (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError)
+
+#Serialize a DataFrame to the Arrow IPC stream format
+def frame_to_ipc(df):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+#Read a DataFrame back from an Arrow IPC stream buffer
+def ipc_to_frame(buf):
+    return pa.ipc.open_stream(buf).read_all().to_pandas()
+# endregion
+
+
+# region Backends
+#Cache shared by every worker of a pod through Arrow IPC files on local disk.
+#Files are read through a memory map out of the OS page cache shared by the workers,
+#every hit still converts its own copy to a DataFrame. The file mtime is the write time used for the TTL and
+#the atime is refreshed on every hit to evict the least recently used files.
+class FileCacheBackend:
+    def __init__(self, path, max_bytes, ttl):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, f'{key}.arrow')
+
+    def get(self, key):
+        path = self._file(key)
+        now = time.time()
+        try:
+            stat = os.stat(path)
+            if now - stat.st_mtime > self.ttl:
+                os.remove(path)
+                raise FileNotFoundError(path)
+            with pa.memory_map(path) as source:
+                df = pa.ipc.open_file(source).read_all().to_pandas()
+            os.utime(path, (now, stat.st_mtime))
+        except (OSError, *arrow_errors):
+            #missing, expired, evicted by another worker or half written
+            self._count('misses')
+            return None
+        self._count('hits')
+        return df
+
+    def set(self, key, df):
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except arrow_errors:
+            return
+        #write to a temporary file and move it in place so readers never see a partial file
+        path = self._file(key)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            with pa.OSFile(tmp_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            #disk full or not writable, the query result is still returned
+            print('query cache set failed', e)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.path):
+            if not entry.name.endswith('.arrow'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, entry.path))
+        nbytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if nbytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            nbytes -= size
+            self._count('evictions')
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def clear(self):
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.arrow'):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def stats(self):
+        files = [i for i in os.scandir(self.path) if i.name.endswith('.arrow')]
+        return {
+            'backend':'file',
+            'entries':len(files),
+            'bytes':sum(i.stat().st_size for i in files),
+            'max_bytes':self.max_bytes,
+            'hits':self.hits,
+            'misses':self.misses,
+            'evictions':self.evictions,
+        }
+
+
+#Cache shared through a Redis compatible server, e.g. a sidecar on localhost.
+#Entries expire with the server TTL and the memory budget and LRU eviction are
+#the server's maxmemory / maxmemory-policy allkeys-lru settings.
+class RedisCacheBackend:
+    def __init__(self, url, ttl, prefix='dashboards:query:'):
+        import redis
+        self._redis_errors = (redis.exceptions.RedisError,)
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        try:
+            buf = self.client.get(self.prefix + key)
+            df = None if buf is None else ipc_to_frame(buf)
+        except (*self._redis_errors, *arrow_errors) as e:
+            print('query cache get failed', e)
+            df = None
+        with self._lock:
+            if df is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return df
+
+    def set(self, key, df):
+        try:
+            buf = frame_to_ipc(df)
+            self.client.set(self.prefix + key, buf.to_pybytes(), ex=max(int(self.ttl), 1))
+        except (*self._redis_errors, *arrow_errors) as e:
+            print('query cache set failed', e)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=f'{self.prefix}*'):
+            self.client.delete(key)
+
+    def stats(self):
+        return {
+            'backend':'redis',
+            'hits':self.hits,
+            'misses':self.misses,
+        }
+# endregion
+
+
+# region Factory
+#Create the query cache selected by the QUERY_CACHE_BACKEND setting
+def create_query_cache(settings):
+    backend = settings['QUERY_CACHE_BACKEND']
+    max_bytes = int(settings['QUERY_CACHE_MAX_MB'] * 1024 * 1024)
+    ttl = settings['QUERY_CACHE_TTL']
+    if backend == 'memory':
+        return QueryCache(max_bytes=max_bytes, ttl=ttl)
+    if backend == 'file':
+        return FileCacheBackend(settings['QUERY_CACHE_DIR'], max_bytes=max_bytes, ttl=ttl)
+    if backend == 'redis':
+        return RedisCacheBackend(settings['QUERY_CACHE_REDIS_URL'], ttl=ttl)
+    raise ValueError(f'Unknown query cache backend: {backend}')
+# endregion
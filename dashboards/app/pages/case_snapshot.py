@@ -0,0 +1,297 @@
+# region Import Modules
+import os
+import time
+import json
+import shutil
+import hashlib
+import threading
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pypika import PostgreSQLQuery
+from pypika import functions as fn
+from .settings import load_settings
+from .sql_utils import aqueon
+from .query_client import PendingQuery, submit_query, submit_query_stream
+from .local_engine import run_local_query, materialize
+from .production import rollup_levels, rollup_table, build_rollup_queries
+# endregion
+
+# region Global Variables
+#Load Environment Variables
+settings = load_settings()
+
+#Per-case tables held in a snapshot, every one of them has a casename column
+snapshot_tables = ['productiondata', 'completiondata', 'fit_info', 'producer_timestep', 'injector_timestep']
+#Monthly aggregates written next to the tables, see production.rollup_levels
+rollup_tables = [rollup_table(level) for level in rollup_levels]
+#Part of every case version, bumped when the files of a snapshot change so older ones are rebuilt
+snapshot_format = 2
+
+#Case versions checked by this worker, {case_name: (version, checked_at)}
+_versions = {}
+#Failed version checks, {case_name: failed_at}, the API isn't asked again before the backoff
+_version_failures = {}
+#Snapshots this worker is building, so a case is only downloaded once at a time
+_building = set()
+_lock = threading.Lock()
+# endregion
+
+
+# region Case Versions
+#Row count of every snapshot table and the fit info of a case.
+#A republished Aqueon run changes its fit info or its row counts.
+def build_version_queries(case_name):
+    counts = None
+    for name in snapshot_tables:
+        table = getattr(aqueon, name)
+        query = PostgreSQLQuery.from_(
+            table
+        ).select(
+            fn.LiteralValue(f"'{name}'").as_('table_name'),
+            fn.Count('*').as_('row_count')
+        ).where(
+            getattr(table, 'casename') == case_name
+        )
+        counts = query if counts is None else counts + query
+    fit_info = aqueon.fit_info
+    fit = PostgreSQLQuery.from_(
+        fit_info
+    ).select(
+        '*'
+    ).where(
+        getattr(fit_info, 'casename') == case_name
+    )
+    return counts, fit
+
+#Version of a case, a hash of its version queries. Checked against the API at most
+#every SNAPSHOT_VERSION_TTL seconds per worker, None when the API can't be reached.
+#After a failed check the last known version, or None, is returned right away for
+#SNAPSHOT_VERSION_RETRY seconds instead of waiting for the API timeout on every query.
+def case_version(case_name):
+    now = time.monotonic()
+    with _lock:
+        version, checked_at = _versions.get(case_name, (None, None))
+        failed_at = _version_failures.get(case_name)
+    if checked_at is not None and now - checked_at < settings['SNAPSHOT_VERSION_TTL']:
+        return version
+    if failed_at is not None and now - failed_at < settings['SNAPSHOT_VERSION_RETRY']:
+        return version
+    try:
+        pending = [submit_query(q.get_sql(), cache=False) for q in build_version_queries(case_name)]
+        counts, fit = [p.result() for p in pending]
+    except Exception as e:
+        print('case version check failed', case_name, e)
+        with _lock:
+            _version_failures[case_name] = time.monotonic()
+        return version
+    counts = counts.sort_values('table_name').astype(str).to_dict('records')
+    fit = fit.astype(str).to_dict('records')
+    version = hashlib.sha256(json.dumps([snapshot_format, counts, fit], sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    with _lock:
+        _versions[case_name] = (version, now)
+        _version_failures.pop(case_name, None)
+    return version
+# endregion
+
+
+# region Snapshot Files
+#Directory of the snapshots of a case, the case name is hashed so any name is a valid path
+def case_dir(case_name):
+    return os.path.join(settings['SNAPSHOT_DIR'], hashlib.sha256(case_name.encode('utf-8')).hexdigest()[:16])
+
+#Parquet file of every snapshot and rollup table, None when the snapshot doesn't exist.
+#The version directory is only created once all its tables are written.
+def snapshot_files(case_name, version):
+    path = os.path.join(case_dir(case_name), version)
+    if not os.path.isdir(path):
+        return None
+    files = {name: os.path.join(path, f'{name}.parquet') for name in snapshot_tables}
+    for name in rollup_tables:
+        if os.path.exists(os.path.join(path, f'{name}.parquet')):
+            files[name] = os.path.join(path, f'{name}.parquet')
+    return files
+
+#Most recent complete snapshot on disk, used when the case version can't be checked
+def latest_snapshot(case_name):
+    path = case_dir(case_name)
+    try:
+        versions = [v for v in os.listdir(path) if os.path.isdir(os.path.join(path, v)) and not v.startswith('.')]
+    except OSError:
+        return None
+    if not versions:
+        return None
+    latest = max(versions, key=lambda v: os.path.getmtime(os.path.join(path, v)))
+    return snapshot_files(case_name, latest)
+
+#Marker of a case version without snapshot, its content is the reason
+def skip_path(case_name, version):
+    return os.path.join(case_dir(case_name), f'.{version}.skip')
+
+#Record that a case version gets no snapshot, so no worker downloads it again.
+#A case over SNAPSHOT_MAX_ROWS is skipped until its version changes, a failed
+#build until SNAPSHOT_RETRY_AFTER seconds have passed.
+def skip_snapshot(case_name, version, reason):
+    try:
+        with open(skip_path(case_name, version), 'w') as f:
+            f.write(reason)
+    except OSError as e:
+        print('snapshot skip marker failed', case_name, e)
+
+def snapshot_skipped(case_name, version):
+    path = skip_path(case_name, version)
+    try:
+        with open(path) as f:
+            reason = f.read()
+        age = time.time() - os.path.getmtime(path)
+    except OSError:
+        return False
+    return reason == 'max_rows' or age < settings['SNAPSHOT_RETRY_AFTER']
+
+#Remove a lock or marker file another worker may have removed already
+def remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+#Download the tables of a case version into Parquet files. A lock file keeps the other
+#workers from downloading the same version, older versions are removed once it's in place.
+def build_snapshot(case_name, version):
+    path = case_dir(case_name)
+    os.makedirs(path, exist_ok=True)
+    lock_path = os.path.join(path, f'.{version}.lock')
+    try:
+        fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        #another worker is building it, unless it died while doing so
+        try:
+            if time.time() - os.path.getmtime(lock_path) < settings['SNAPSHOT_BUILD_TIMEOUT']:
+                return
+        except OSError:
+            #released meanwhile
+            pass
+        remove_file(lock_path)
+        return build_snapshot(case_name, version)
+    os.close(fd)
+    tmp_path = os.path.join(path, f'.{version}.tmp')
+    pending = {}
+    try:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        max_rows = settings['SNAPSHOT_MAX_ROWS']
+        for name in snapshot_tables:
+            table = getattr(aqueon, name)
+            query = PostgreSQLQuery.from_(table).select('*').where(getattr(table, 'casename') == case_name)
+            pending[name] = submit_query_stream(query.get_sql(), max_rows=max_rows, cache=False)
+        for name, p in pending.items():
+            df = p.result()
+            if getattr(p, 'truncated', False):
+                print(f'case {case_name} has more than {max_rows} rows in {name}, no snapshot is kept')
+                skip_snapshot(case_name, version, 'max_rows')
+                return
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), os.path.join(tmp_path, f'{name}.parquet'))
+        build_rollups(case_name, tmp_path)
+        os.replace(tmp_path, os.path.join(path, version))
+        print(f'snapshot {version} of case {case_name} written')
+        for v in os.listdir(path):
+            if v == version or v.startswith(f'.{version}.'):
+                continue
+            if not v.startswith('.'):
+                shutil.rmtree(os.path.join(path, v), ignore_errors=True)
+            elif v.endswith('.skip'):
+                remove_file(os.path.join(path, v))
+    except Exception as e:
+        print('snapshot build failed', case_name, e)
+        skip_snapshot(case_name, version, 'failed')
+    finally:
+        #the tables still downloading when a build stops early aren't needed anymore
+        for p in pending.values():
+            p.cancel()
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        remove_file(lock_path)
+
+#Materialize the rollup tables of a case from the snapshot tables in path.
+#A snapshot without them still serves every query from the tables.
+def build_rollups(case_name, path):
+    files = {name: os.path.join(path, f'{name}.parquet') for name in snapshot_tables}
+    queries = {name: q.get_sql() for name, q in build_rollup_queries(case_name).items()}
+    try:
+        materialize(files, queries, path)
+    except Exception as e:
+        print('rollup build failed', case_name, e)
+        for name in queries:
+            try:
+                os.remove(os.path.join(path, f'{name}.parquet'))
+            except OSError:
+                pass
+
+#Build the snapshot of a case version on a background thread of this worker
+def start_build(case_name, version):
+    with _lock:
+        if (case_name, version) in _building:
+            return
+        _building.add((case_name, version))
+    def build():
+        try:
+            build_snapshot(case_name, version)
+        finally:
+            with _lock:
+                _building.discard((case_name, version))
+    threading.Thread(target=build, name='case-snapshot', daemon=True).start()
+
+#Snapshot files of the current version of a case. The first call for a new version starts
+#downloading it and returns None, the case is served by the API until the snapshot is ready
+#or for good when the version is skipped. When the API can't be reached the last snapshot
+#on disk is used.
+def snapshot_paths(case_name):
+    version = case_version(case_name)
+    if version is None:
+        return latest_snapshot(case_name)
+    files = snapshot_files(case_name, version)
+    if files is None and not snapshot_skipped(case_name, version):
+        start_build(case_name, version)
+    return files
+
+#Snapshot files of the current version of a case, built on the calling thread when missing.
+#A build started by another thread or worker is waited for up to SNAPSHOT_BUILD_TIMEOUT
+#seconds. None when the case gets no snapshot, or it isn't ready by then.
+def ensure_snapshot(case_name):
+    version = case_version(case_name)
+    if version is None:
+        return latest_snapshot(case_name)
+    lock_path = os.path.join(case_dir(case_name), f'.{version}.lock')
+    deadline = time.monotonic() + settings['SNAPSHOT_BUILD_TIMEOUT']
+    while True:
+        files = snapshot_files(case_name, version)
+        if files is not None or snapshot_skipped(case_name, version) or time.monotonic() > deadline:
+            return files
+        with _lock:
+            building = (case_name, version) in _building
+        if building or os.path.exists(lock_path):
+            time.sleep(1)
+        else:
+            build_snapshot(case_name, version)
+# endregion
+
+
+# region Case Queries
+#Send a query of a case to the engine chosen by QUERY_ENGINE. The local engine answers from
+#the case snapshot once it exists, the API answers until then and whatever the engine rejects.
+#local_query is an equivalent statement tried first by the local engine, e.g. on the rollup
+#tables. stream=True streams the API response like submit_query_stream.
+def submit_case_query(case_name, query_str, stream=False, local_query=None):
+    if settings['QUERY_ENGINE'] == 'local':
+        files = snapshot_paths(case_name)
+        if files is not None:
+            for q in [local_query, query_str]:
+                if q is None:
+                    continue
+                df = run_local_query(files, q)
+                if df is not None:
+                    return PendingQuery(query_str, None, df=df)
+    return submit_query_stream(query_str) if stream else submit_query(query_str)
+
+#Run a query of a case and return its result as a DataFrame
+def run_case_query(case_name, query_str, stream=False, local_query=None):
+    return submit_case_query(case_name, query_str, stream, local_query).result()
+# endregion
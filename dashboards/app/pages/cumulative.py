@@ -0,0 +1,44 @@
+# region Import Modules
+from pypika import Case, DatePart
+from pypika import functions as fn
+# endregion
+
+# region Global Variables
+#Days of every month of a common year, February gets one more in leap years
+month_days = {1:31, 2:28, 3:31, 4:30, 5:31, 6:30, 7:31, 8:31, 9:30, 10:31, 11:30, 12:31}
+# endregion
+
+
+# region Calendar
+#Gregorian leap year condition on a year column
+def is_leap_year(year):
+    return ((year % 4 == 0) & (year % 100 != 0)) | (year % 400 == 0)
+
+#Number of days of a month from its year and month columns. The calendar is a lookup on
+#the month number, so no date is built, truncated or shifted by an interval for every row.
+def days_in_month(year, month):
+    days = Case()
+    for m, d in month_days.items():
+        if m == 2:
+            days = days.when(month == m, Case().when(is_leap_year(year), d + 1).else_(d))
+        else:
+            days = days.when(month == m, d)
+    return days
+
+#Year and month columns of a date column, for tables without Year and Month. EXTRACT
+#returns a double or numeric depending on the engine, the leap year MOD needs integers.
+def month_parts(date_col):
+    return (
+        fn.Cast(fn.Extract(DatePart.year, date_col), 'INTEGER'),
+        fn.Cast(fn.Extract(DatePart.month, date_col), 'INTEGER')
+    )
+# endregion
+
+
+# region Volumes
+#Cumulative volume of a monthly rate column, the rate times the days of its month summed
+#over the rows and scaled, e.g. 1e-3 for thousands. Every cumulative of the page goes
+#through here, so the ETL cards, the leaderboards and the crossplot agree.
+def cumulative(rate, year, month, scale=1.0):
+    return fn.Sum(rate * days_in_month(year, month) * scale)
+# endregion
@@ -0,0 +1,115 @@
+# region Import Modules
+import numpy as np
+import pandas as pd
+from .settings import load_settings
+# endregion
+
+# region Global Variables
+#Load Environment Variables
+settings = load_settings()
+# endregion
+
+
+# region Point Selection
+#Numeric view of a plot axis, dates become nanoseconds and missing values zero
+def as_float(values):
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype('datetime64[ns]').astype('int64').to_numpy(dtype=float)
+    return np.nan_to_num(pd.to_numeric(values, errors='coerce').to_numpy(dtype=float))
+
+#Largest-Triangle-Three-Buckets: keep the first and last points and, from every bucket
+#in between, the point forming the largest triangle with the previously kept point
+#and the average of the next bucket. Bucket averages and areas are computed with NumPy,
+#only the walk over the buckets is sequential.
+def lttb(x, y, n_out):
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    avg_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    idx = np.empty(n_out, dtype=int)
+    idx[0] = 0
+    idx[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs(
+            (x[a] - next_x[i]) * (y[lo:hi] - y[a]) -
+            (x[a] - x[lo:hi]) * (next_y[i] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+#Min/max decimation: keep the lowest and highest point of every bucket,
+#which preserves spikes and shut-ins. Fully vectorized over a padded bucket matrix.
+def minmax(x, y, n_out):
+    n = len(x)
+    nbuckets = (n_out - 2) // 2
+    if n_out >= n or nbuckets < 1:
+        return np.arange(n)
+    size = -(-n // nbuckets)
+    padded = np.full(nbuckets * size, np.nan)
+    padded[:n] = y
+    buckets = padded.reshape(nbuckets, size)
+    offsets = np.arange(nbuckets) * size
+    idx_min = offsets + np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis=1)
+    idx_max = offsets + np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=1)
+    idx = np.concatenate([[0, n - 1], idx_min, idx_max])
+    return np.unique(idx[idx < n])
+
+downsampling_methods = {
+    'lttb':lttb,
+    'minmax':minmax,
+}
+
+#Indices of the points kept from a trace. Points inside x_range, the zoomed window,
+#are all kept and the rest of the trace is reduced to at most max_points points.
+def downsample_indices(x, y, max_points, method='lttb', x_range=None):
+    n = len(x)
+    if method not in downsampling_methods or n <= max_points:
+        return np.arange(n)
+    idx = downsampling_methods[method](x, y, max_points)
+    if x_range is not None:
+        lo, hi = x_range
+        in_range = np.flatnonzero((x >= lo) & (x <= hi))
+        idx = np.union1d(idx, in_range)
+    return idx
+# endregion
+
+
+# region Plot Helpers
+#Date range of the x axis zoomed by the user, None when the plot shows everything
+def relayout_x_range(relayout_data):
+    if not relayout_data:
+        return None
+    if 'xaxis.range[0]' in relayout_data and 'xaxis.range[1]' in relayout_data:
+        x_range = [relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']]
+    elif 'xaxis.range' in relayout_data:
+        x_range = relayout_data['xaxis.range']
+    else:
+        return None
+    try:
+        return tuple(pd.Timestamp(i) for i in x_range)
+    except (ValueError, TypeError):
+        return None
+
+#Rows of a trace DataFrame to plot, downsampled along x_col with the shape of y_col.
+#Uses the PLOT_DOWNSAMPLING method and PLOT_MAX_POINTS budget unless given.
+def downsample_frame(df, x_col, y_col, x_range=None, max_points=None, method=None):
+    max_points = max_points or settings['PLOT_MAX_POINTS']
+    method = method or settings['PLOT_DOWNSAMPLING']
+    if len(df) <= max_points or method == 'none':
+        return df
+    x = as_float(df[x_col])
+    y = as_float(df[y_col])
+    if x_range is not None:
+        x_range = tuple(as_float(pd.Series(x_range)))
+    return df.iloc[downsample_indices(x, y, max_points, method, x_range)]
+# endregion
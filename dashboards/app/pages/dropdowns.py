@@ -0,0 +1,72 @@
+# region Import Modules
+from pypika import PostgreSQLQuery
+from pypika import functions as fn
+from .sql_utils import aqueon
+# endregion
+
+
+# region Dropdown Queries
+#Producers and injectors of a case with their well name and status
+def build_wells_dropdown_query(case_name):
+    productiondata = aqueon.productiondata
+    completiondata = aqueon.completiondata
+
+    #007-producers_injectors_dropdown.sql
+    query_base = PostgreSQLQuery.from_(
+        productiondata
+    ).left_join(
+        aqueon.completiondata
+    ).on(
+        (productiondata.WellAPI == completiondata.WellAPI) &
+        (productiondata.casename == completiondata.casename)
+    ).where(
+        getattr(productiondata, 'casename') == case_name
+    )
+
+    query_producers = query_base.where(
+        (getattr(productiondata, 'Qo') + getattr(productiondata, 'Qw') + getattr(productiondata, 'Qg')) > 0,
+    ).select(
+        getattr(completiondata, 'WellName'),
+        getattr(productiondata, 'WellAPI'),
+        getattr(productiondata, 'Status'),
+    ).distinct()
+
+    query_injectors = query_base.where(
+        getattr(productiondata, 'Qs') > 0
+    ).select(
+        getattr(completiondata, 'WellName'),
+        getattr(productiondata, 'WellAPI'),
+        getattr(productiondata, 'Status')
+    ).distinct()
+
+    return query_producers + query_injectors
+
+#Layers, faultblocks and compartments of a case as (name, type) rows
+def build_zones_dropdown_query(case_name):
+    completiondata = aqueon.completiondata
+
+    #008-ly_fb_comp_dropdown.sql
+    query_base = PostgreSQLQuery.from_(
+        completiondata
+    ).where(
+        getattr(completiondata, 'casename') == case_name
+    )
+
+    query_layer = query_base.select(
+        getattr(completiondata, 'Reservoir').as_('name'),
+        #add constant column
+        fn.LiteralValue("'layer'").as_('type')
+    ).distinct()
+
+    query_faultblock = query_base.select(
+        getattr(completiondata, 'FaultBlock').as_('name'),
+        fn.LiteralValue("'faulblock'").as_('type')
+    ).distinct()
+
+    query_compartment = query_base.select(
+        getattr(completiondata, 'Compartment').as_('name'),
+        fn.LiteralValue("'compartment'").as_('type')
+    ).distinct()
+
+    return query_layer + query_faultblock + query_compartment
+# endregion
@@ -0,0 +1,97 @@
+# region Import Modules
+import numpy as np
+import pandas as pd
+from plotly import graph_objects as go
+from matplotlib import colormaps
+from matplotlib.colors import ListedColormap
+from .settings import load_settings
+# endregion
+
+# region Global Variables
+#Load Environment Variables
+settings = load_settings()
+# endregion
+
+
+# region WebGL
+#Trace class of a scatter figure, WebGL once the points are too many for SVG
+def scatter_type(npoints):
+    return go.Scattergl if npoints > settings['PLOT_WEBGL_POINTS'] else go.Scatter
+
+#Groups past the trace threshold are drawn as one WebGL trace per selection state
+#with per point colors, so the browser cost follows the points instead of the traces
+def merge_groups(ngroups):
+    return ngroups > settings['PLOT_WEBGL_TRACES']
+
+#Colors of the points of merged groups, codes are the group number of every row
+def group_colors(codes, colors):
+    return np.asarray(colors, dtype=object)[np.asarray(codes)]
+
+#Sort the arrays of a merged trace by group and put an empty point between groups,
+#so lines of different groups aren't joined. The order inside a group is kept.
+#The empty point repeats the colors and labels of the group before it, it's never drawn.
+def break_between_groups(codes, *arrays):
+    order = np.argsort(codes, kind='stable')
+    breaks = np.flatnonzero(np.diff(np.asarray(codes)[order])) + 1
+    out = []
+    for values in arrays:
+        values = np.asarray(values)[order]
+        if values.dtype.kind == 'f':
+            out.append(np.insert(values, breaks, np.nan))
+        else:
+            out.append(np.insert(values, breaks, values[breaks - 1]))
+    return out
+# endregion
+
+
+# region Selection
+#Marker size and outline of every point, selected wells are bigger with a black outline.
+#Pass the group codes of a merged trace with well paths to add the breaks between groups.
+def selection_marker(is_selected, codes=None):
+    is_selected = np.asarray(is_selected, dtype=bool)
+    size = np.where(is_selected, 10, 5)
+    color = np.where(is_selected, 'black', 'white')
+    #object dtype so the breaks repeat the width instead of an invalid NaN
+    width = np.where(is_selected, 1, 0.5).astype(object)
+    if codes is not None:
+        size, color, width = break_between_groups(codes, size, color, width)
+    return {
+        'size':size.tolist(),
+        'line':{
+            'color':color.tolist(),
+            'width':width.tolist(),
+        }
+    }
+# endregion
+
+
+# region Hover Labels
+#Hover text of every row as 'column: value' lines, built column by column with
+#vectorized string concatenation instead of a Python call per row
+def hover_text(df, cols):
+    text = pd.Series('', index=df.index, dtype=object)
+    for i, col in enumerate(cols):
+        line = f'{col}: ' + pd.Series(df[col].to_numpy().astype(str), index=df.index, dtype=object)
+        text = line if i == 0 else text + '<br>' + line
+    return text
+# endregion
+
+
+# region Colormaps
+#Colors of a colormap resampled to n groups like get_cmap(name, n), as rgba strings
+#with 0-255 channels so they match the colors restyled in the browser
+def colormap_colors(name, n, alpha):
+    rgb = np.round(colormaps[name].resampled(n)(np.arange(n))[:, :3] * 255).astype(int)
+    return [f'rgba({r},{g},{b},{alpha})' for r, g, b in rgb]
+
+#Colormap sampled for the clientside restyling in assets/plot_style.js.
+#Small listed colormaps keep their colors, the rest are interpolated between samples.
+def colormap_samples(name, nsamples=65):
+    cmap = colormaps[name]
+    listed = isinstance(cmap, ListedColormap) and cmap.N <= 64
+    rgb = cmap(np.arange(cmap.N)) if listed else cmap(np.linspace(0, 1, nsamples))
+    return {
+        'listed':listed,
+        'colors':np.round(rgb[:, :3] * 255).astype(int).tolist(),
+    }
+# endregion
@@ -0,0 +1,132 @@
+# region Import Modules
+import threading
+from collections import OrderedDict
+from dash.exceptions import PreventUpdate
+# endregion
+
+# region Global Variables
+#Filter keys of a snapshot and the dropdown that sets each one
+filter_dropdowns = {
+    'prods':'summary_settings_producers_dropdown',
+    'injs':'summary_settings_injectors_dropdown',
+    'layers':'summary_settings_layers_dropdown',
+    'fbs':'summary_settings_faultblocks_dropdown',
+    'comps':'summary_settings_compartments_dropdown',
+}
+
+#Latest snapshot version seen for every tab in this worker, oldest tabs are dropped. A tab is
+#one render of the case page, the summary_filter_tab store of its layout.
+max_tabs = 10000
+_latest_versions = OrderedDict()
+_lock = threading.Lock()
+
+#Latest run of every callback for every browser tab, and the queries still in flight per tab
+_latest_requests = OrderedDict()
+_inflight = {}
+# endregion
+
+
+# region Filter Snapshots
+#The dropdowns of the summary tab are coalesced by assets/filter_state.js into one
+#snapshot {'tab', 'version', 'prods', 'injs', 'layers', 'fbs', 'comps'}.
+#Callbacks depend on the snapshot instead of the dropdowns, so a click that writes
+#five dropdowns runs every figure once.
+
+#Filters of a snapshot in dropdown order, stops the callback until the first snapshot exists
+def unpack_filters(snapshot):
+    if snapshot is None:
+        raise PreventUpdate
+    track_version(snapshot)
+    return [snapshot[k] or [] for k in filter_dropdowns]
+
+#Record the version of a snapshot, newer versions of the same tab make older ones stale
+#and the queries still running for them are cancelled
+def track_version(snapshot):
+    tab = snapshot['tab']
+    with _lock:
+        if _latest_versions.get(tab, -1) < snapshot['version']:
+            _latest_versions[tab] = snapshot['version']
+            cancel_inflight(tab, lambda scope: scope.version < snapshot['version'])
+        _latest_versions.move_to_end(tab)
+        while len(_latest_versions) > max_tabs:
+            _latest_versions.popitem(last=False)
+
+#Drop the result of a callback whose filters were replaced while it was querying,
+#together with the queries it still has in flight
+def drop_if_stale(scope):
+    if scope.is_stale():
+        print(f'dropping {scope.owner} of filter version {scope.version} of tab {scope.tab}')
+        scope.cancel()
+        raise PreventUpdate
+# endregion
+
+
+# region Request Scopes
+#The queries of one run of a callback for one browser tab, tagged with the filter version
+#and the run number. A newer filter snapshot of the tab, or a newer run of the same callback
+#(e.g. after the aggregation changed), cancels them on the client side: the connection is
+#closed and the waiting callback stops before its result reaches the figure.
+class RequestScope:
+    def __init__(self, snapshot, owner, seq):
+        self.tab = snapshot['tab']
+        self.version = snapshot['version']
+        self.owner = owner
+        self.seq = seq
+
+    #True when a newer snapshot of the tab or a newer run of the callback reached this worker
+    def is_stale(self):
+        with _lock:
+            return (
+                _latest_versions.get(self.tab, -1) > self.version or
+                _latest_requests.get((self.tab, self.owner), -1) > self.seq
+            )
+
+    #Register a submitted query so newer requests can cancel it, returns the query
+    def watch(self, pending):
+        with _lock:
+            _inflight.setdefault(self.tab, []).append((self, pending))
+        if self.is_stale():
+            self.cancel()
+        return pending
+
+    #Wait for a query of the scope and return its DataFrame
+    def result(self, pending):
+        self.watch(pending)
+        try:
+            return pending.result()
+        finally:
+            with _lock:
+                queries = _inflight.get(self.tab, [])
+                queries[:] = [(s, p) for s, p in queries if p is not pending]
+                if not queries:
+                    _inflight.pop(self.tab, None)
+
+    #Cancel every query of the scope still in flight
+    def cancel(self):
+        with _lock:
+            cancel_inflight(self.tab, lambda scope: scope is self)
+
+#Start a run of a callback for the tab of a filter snapshot, cancelling the queries
+#of its previous runs that are still in flight
+def begin_request(snapshot, owner):
+    track_version(snapshot)
+    key = (snapshot['tab'], owner)
+    with _lock:
+        seq = _latest_requests.get(key, -1) + 1
+        _latest_requests[key] = seq
+        _latest_requests.move_to_end(key)
+        while len(_latest_requests) > max_tabs:
+            _latest_requests.popitem(last=False)
+        cancel_inflight(snapshot['tab'], lambda scope: scope.owner == owner and scope.seq < seq)
+    return RequestScope(snapshot, owner, seq)
+
+#Cancel the in-flight queries of a tab whose scope matches, the lock must be held
+def cancel_inflight(tab, matches):
+    queries = _inflight.get(tab, [])
+    for scope, pending in queries:
+        if matches(scope):
+            pending.cancel()
+    queries[:] = [(s, p) for s, p in queries if not matches(s)]
+    if not queries:
+        _inflight.pop(tab, None)
+# endregion
@@ -0,0 +1,134 @@
+# region Import Modules
+import hashlib
+from pypika import PostgreSQLQuery
+from .settings import load_settings
+from .sql_utils import aqueon
+from .query_cache import QueryCache
+from .cumulative import cumulative
+from .production import actual_columns
+from .case_snapshot import run_case_query
+# endregion
+
+# region Global Variables
+#Load Environment Variables
+settings = load_settings()
+
+#Groups a leaderboard ranks, by a completiondata column. members is the phase a group
+#needs some volume of to be listed, e.g. injectors are the wells with injection.
+leaderboard_dimensions = {
+    'wells':{'label':'Wells', 'column':'WellName'},
+    'injectors':{'label':'Injectors', 'column':'WellName', 'members':'injectant'},
+    'reservoirs':{'label':'Reservoirs', 'column':'Reservoir'},
+    'faultblocks':{'label':'Fault Blocks', 'column':'FaultBlock'},
+    'compartments':{'label':'Compartments', 'column':'Compartment'},
+}
+
+#Columns of the completions every ranking is rolled up from
+leaderboard_columns = list(dict.fromkeys(d['column'] for d in leaderboard_dimensions.values()))
+
+#Rows of a page of the grids
+leaderboard_page_size = 10
+
+#Rankings of the cases seen by this worker, one entry per case query, dimension and phase.
+#The query result itself is kept by the query cache.
+leaderboard_cache = QueryCache(max_bytes=32 * 1024 * 1024, ttl=settings['QUERY_CACHE_TTL'])
+# endregion
+
+
+# region Rankings
+#Cumulative of every phase in thousands per completion, the one pass all the rankings
+#are computed from since the cumulatives add up to any coarser group
+def build_leaderboard_query(case_name):
+    productiondata = aqueon.productiondata
+    completiondata = aqueon.completiondata
+    year = getattr(productiondata, 'Year')
+    month = getattr(productiondata, 'Month')
+
+    cums = []
+    for phase, cols in actual_columns.items():
+        rate = None
+        for col in cols:
+            rate = getattr(productiondata, col) if rate is None else rate + getattr(productiondata, col)
+        cums.append(cumulative(rate, year, month, 1e-3).as_(f'{phase}_cum'))
+
+    group_cols = [getattr(completiondata, c) for c in leaderboard_columns]
+    return PostgreSQLQuery.from_(
+        productiondata
+    ).left_join(
+        completiondata
+    ).on(
+        (productiondata.WellAPI == completiondata.WellAPI) &
+        (productiondata.casename == completiondata.casename) &
+        (productiondata.CompSubId == completiondata.CompSubId)
+    ).where(
+        getattr(productiondata, 'casename') == case_name
+    ).select(
+        *group_cols,
+        *cums
+    ).groupby(
+        *group_cols
+    )
+
+def ranking_key(query_str, dimension, phase):
+    return hashlib.sha256(f'{dimension}\n{phase}\n{query_str}'.encode('utf-8')).hexdigest()
+
+#Every dimension and phase ranked from the completion cumulatives, largest first.
+#Groups without volume of the phase, or of the members phase, aren't listed.
+def compute_rankings(df):
+    rankings = {}
+    for dimension, spec in leaderboard_dimensions.items():
+        column = spec['column']
+        groups = df.groupby(column, dropna=False)[[f'{p}_cum' for p in actual_columns]].sum()
+        if 'members' in spec:
+            groups = groups.loc[groups[f"{spec['members']}_cum"] > 0]
+        for phase in actual_columns:
+            ranked = groups.loc[groups[f'{phase}_cum'] > 0, [f'{phase}_cum']]
+            ranked = ranked.sort_values(f'{phase}_cum', ascending=False, kind='stable').round(2)
+            ranked = ranked.reset_index()
+            ranked.insert(0, 'rank', range(1, len(ranked)+1))
+            ranked[column] = ranked[column].fillna('NA')
+            rankings[(dimension, phase)] = ranked
+    return rankings
+
+#Ranking of a case by a dimension and a phase. A miss runs the completion query once
+#and caches the rankings of every dimension and phase, so switching the grids is served here.
+def leaderboard(case_name, dimension, phase):
+    query_str = build_leaderboard_query(case_name).get_sql()
+    ranked = leaderboard_cache.get(ranking_key(query_str, dimension, phase))
+    if ranked is not None:
+        return ranked
+    rankings = compute_rankings(run_case_query(case_name, query_str))
+    for (d, p), df in rankings.items():
+        leaderboard_cache.set(ranking_key(query_str, d, p), df)
+    return rankings[(dimension, phase)]
+# endregion
+
+
+# region Pagination
+#Rows of the block asked by the infinite row model of an AgGrid and the row count.
+#request is its getRowsRequest, sorted by the sortModel of the grid or by rank.
+def leaderboard_rows(case_name, dimension, phase, request):
+    df = leaderboard(case_name, dimension, phase)
+    sort_model = [s for s in request.get('sortModel') or [] if s.get('colId') in df.columns]
+    if sort_model:
+        df = df.sort_values(
+            [s['colId'] for s in sort_model],
+            ascending=[s.get('sort') != 'desc' for s in sort_model],
+            kind='stable'
+        )
+    start = request.get('startRow') or 0
+    end = request.get('endRow') or start + leaderboard_page_size
+    return {
+        'rowData':df.iloc[start:end].to_dict('records'),
+        'rowCount':len(df),
+    }
+
+#Columns of the grid of a dimension and phase
+def leaderboard_column_defs(dimension, phase):
+    spec = leaderboard_dimensions[dimension]
+    return [
+        {'field':'rank', 'headerName':'#', 'maxWidth':70},
+        {'field':spec['column'], 'headerName':spec['label']},
+        {'field':f'{phase}_cum', 'headerName':f'{phase.capitalize()} Cum'},
+    ]
+# endregion
@@ -0,0 +1,119 @@
+# region Import Modules
+import os
+import re
+import pyarrow as pa
+from .query_client import table_to_frame
+from .cache_backends import arrow_errors
+# endregion
+
+# region Global Variables
+#Quoted literals and identifiers, their content is never rewritten
+_quoted_pattern = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+
+#Postgres functions of sql_utils replaced by a DuckDB macro with the Postgres behaviour
+function_shims = {
+    'MAKE_DATE':'pg_make_date',
+    'DATE_TRUNC':'pg_date_trunc',
+}
+
+#MAKE_DATE takes integers, snapshot columns that went through JSON can be floats.
+#DATE_TRUNC on a date returns a timestamp in Postgres.
+shim_macros = [
+    'CREATE MACRO pg_make_date(y, m, d) AS make_date(CAST(y AS BIGINT), CAST(m AS BIGINT), CAST(d AS BIGINT))',
+    'CREATE MACRO pg_date_trunc(part, d) AS date_trunc(part, CAST(d AS TIMESTAMP))',
+]
+
+#EXTRACT returns a number with a fraction in Postgres and an integer in DuckDB
+extract_shim = ('CAST(', ' AS DOUBLE)')
+
+_function_pattern = re.compile(r'\b(' + '|'.join([*function_shims, 'EXTRACT']) + r')\s*\(', re.IGNORECASE)
+# endregion
+
+
+# region Dialect Shims
+#Position of the parenthesis closing the one at start
+def closing_paren(masked, start):
+    depth = 0
+    for i in range(start, len(masked)):
+        if masked[i] == '(':
+            depth += 1
+        elif masked[i] == ')':
+            depth -= 1
+            if depth == 0:
+                return i
+    raise ValueError('unbalanced parentheses')
+
+#Rewrite a statement generated for Postgres so DuckDB runs it with the same results.
+#Function calls are found on a copy with the quoted text blanked out, so a column
+#or a literal named like a function is left alone.
+def to_duckdb(query_str):
+    masked = _quoted_pattern.sub(lambda m: m.group(0)[0] + ' ' * (len(m.group(0)) - 2) + m.group(0)[-1], query_str)
+    edits = []
+    for m in _function_pattern.finditer(masked):
+        name = m.group(1).upper()
+        if name == 'EXTRACT':
+            end = closing_paren(masked, m.end() - 1)
+            edits.append((m.start(), 0, extract_shim[0]))
+            edits.append((end + 1, 0, extract_shim[1]))
+        else:
+            edits.append((m.start(), len(m.group(1)), function_shims[name]))
+    #edits are applied from the end so the positions of the others stay valid
+    for pos, length, text in sorted(edits, key=lambda e: e[0], reverse=True):
+        query_str = query_str[:pos] + text + query_str[pos + length:]
+    return query_str
+
+#Arrow types of a DuckDB result as the API returns them. Integer sums are HUGEINT in DuckDB
+#and bigint in Postgres, numeric sums become floats instead of Python Decimals.
+def postgres_types(table):
+    for i, field in enumerate(table.schema):
+        if pa.types.is_decimal(field.type):
+            target = pa.int64() if field.type.scale == 0 else pa.float64()
+            table = table.set_column(i, field.name, table.column(i).cast(target))
+    return table
+# endregion
+
+
+# region Engine
+#In-memory DuckDB connection with the tables mapped to Parquet files in the aqueon schema,
+#the shim macros and the Postgres integer division
+def connect(files):
+    import duckdb
+    con = duckdb.connect()
+    con.execute('SET integer_division=true')
+    for macro in shim_macros:
+        con.execute(macro)
+    con.execute('CREATE SCHEMA aqueon')
+    for name, path in files.items():
+        path = path.replace("'", "''")
+        con.execute(f"CREATE VIEW aqueon.{name} AS SELECT * FROM read_parquet('{path}')")
+    return con
+
+#Tables of files a statement reads, the others aren't mapped for it
+def referenced_files(files, query_str):
+    return {name: path for name, path in files.items() if f'"{name}"' in query_str}
+
+#Run a statement built for the API on local tables, returns None when the engine can't run it
+def run_local_query(files, query_str):
+    import duckdb
+    con = connect(referenced_files(files, query_str))
+    try:
+        table = con.execute(to_duckdb(query_str)).fetch_arrow_table()
+        return table_to_frame(postgres_types(table))
+    except (duckdb.Error, ValueError, *arrow_errors) as e:
+        print('local query failed, using the API', e)
+        print(query_str)
+        return None
+    finally:
+        con.close()
+
+#Write the result of every statement of {name: query_str} to name.parquet in path,
+#the statements run on the tables of files
+def materialize(files, queries, path):
+    con = connect(files)
+    try:
+        for name, query_str in queries.items():
+            target = os.path.join(path, f'{name}.parquet').replace("'", "''")
+            con.execute(f"COPY ({to_duckdb(query_str)}) TO '{target}' (FORMAT PARQUET)")
+    finally:
+        con.close()
+# endregion
@@ -0,0 +1,121 @@
+# region Import Modules
+from pypika import PostgreSQLQuery, Case
+from pypika import functions as fn
+import pandas as pd
+from .sql_utils import aqueon, distinct, production_date
+from .cumulative import cumulative
+from .case_snapshot import run_case_query
+# endregion
+
+
+# region Overview Queries
+#Cumulative columns of the ETL cards (MMbbl / MMscf) and their rate column
+cum_columns = {
+    'oil_cum':'Qo',
+    'water_cum':'Qw',
+    'gas_cum':'Qg',
+    'injectant_cum':'Qs',
+}
+
+#Counts, dates and cumulatives of a case with a single scan of productiondata.
+#The per-well subquery classifies every well once and the outer query rolls the
+#flags and volumes up; the completiondata counts are joined as a one row table.
+def build_overview_query(case_name):
+    productiondata = aqueon.productiondata
+    completiondata = aqueon.completiondata
+
+    date_col = production_date(productiondata)
+    rate_gross = getattr(productiondata, 'Qo') + getattr(productiondata, 'Qw') + getattr(productiondata, 'Qg')
+
+    #011-case_overview.sql
+    wells_query = PostgreSQLQuery.from_(
+        productiondata
+    ).select(
+        getattr(productiondata, 'WellAPI'),
+        fn.Max(Case().when(rate_gross > 0, 1).else_(0)).as_('is_producer'),
+        fn.Max(Case().when(getattr(productiondata, 'Qs') > 0, 1).else_(0)).as_('is_injector'),
+        fn.Count(distinct(getattr(productiondata, 'Status'))).as_('status_count'),
+        fn.Min(date_col).as_('min_date'),
+        fn.Max(date_col).as_('max_date'),
+        *[
+            cumulative(getattr(productiondata, col), getattr(productiondata, 'Year'), getattr(productiondata, 'Month'), 1e-6).as_(cum)
+            for cum, col in cum_columns.items()
+        ]
+    ).where(
+        getattr(productiondata, 'casename') == case_name
+    ).groupby(
+        getattr(productiondata, 'WellAPI')
+    ).as_('wells')
+
+    layers_query = PostgreSQLQuery.from_(
+        completiondata
+    ).select(
+        fn.Count(distinct(getattr(completiondata, 'Reservoir'))).as_('total_layers'),
+        fn.Count(distinct(getattr(completiondata, 'FaultBlock'))).as_('total_faultblocks'),
+        fn.Count(distinct(getattr(completiondata, 'Compartment'))).as_('total_compartments'),
+    ).where(
+        getattr(completiondata, 'casename') == case_name
+    ).as_('layers')
+
+    query = PostgreSQLQuery.from_(
+        wells_query
+    ).from_(
+        layers_query
+    ).select(
+        fn.Count(getattr(wells_query, 'WellAPI')).as_('total_wells'),
+        fn.Sum(getattr(wells_query, 'is_producer')).as_('producer_wells'),
+        fn.Sum(getattr(wells_query, 'is_injector')).as_('injector_wells'),
+        fn.Sum(Case().when(getattr(wells_query, 'status_count') > 1, 1).else_(0)).as_('conversion_wells'),
+        fn.Min(getattr(wells_query, 'min_date')).as_('min_date'),
+        fn.Max(getattr(wells_query, 'max_date')).as_('max_date'),
+        *[fn.Sum(getattr(wells_query, cum)).as_(cum) for cum in cum_columns],
+        *[
+            fn.Max(getattr(layers_query, i)).as_(i)
+            for i in ['total_layers','total_faultblocks','total_compartments']
+        ]
+    )
+    return query
+
+#009-fit_info.sql
+def build_fit_info_query(case_name):
+    fit_info = aqueon.fit_info
+    query = PostgreSQLQuery.from_(
+        fit_info
+    ).select(
+        getattr(fit_info, 'FitStartDate').as_('fit_startdate'),
+        getattr(fit_info, 'FitEndDate').as_('fit_enddate'),
+        getattr(fit_info, 'IsBacktest').as_('is_backtest'),
+        getattr(fit_info, 'BacktestEndDate').as_('backtest_enddate'),
+        getattr(fit_info,'Dt').as_('dt')
+    ).where(
+        getattr(fit_info, 'casename') == case_name
+    ).limit(1)
+    return query
+# endregion
+
+
+# region Overview Service
+#Fetch everything the case header, fit cards and ETL cards need in two requests
+def fetch_case_overview(case_name):
+    counts = run_case_query(case_name, build_overview_query(case_name).get_sql()).iloc[0]
+    fit = run_case_query(case_name, build_fit_info_query(case_name).get_sql()).iloc[0]
+
+    overview = {
+        'total_wells':counts['total_wells'],
+        'producer_wells':counts['producer_wells'],
+        'injector_wells':counts['injector_wells'],
+        'conversion_wells':counts['conversion_wells'],
+        'total_layers':counts['total_layers'],
+        'total_faultblocks':counts['total_faultblocks'],
+        'total_compartments':counts['total_compartments'],
+        'fit_startdate':str(fit['fit_startdate'])[:10],
+        'fit_enddate':str(fit['fit_enddate'])[:10],
+        'fit_type':'BT' if fit['is_backtest'] else 'FF',
+        'backtest_enddate':str(fit['backtest_enddate'])[:10] if fit['is_backtest'] else 'N/A',
+        'date_range':str(counts['min_date'])[:10] + ' to ' + str(counts['max_date'])[:10],
+    }
+    #Cumulative values rounded to 2 decimals
+    for cum in cum_columns:
+        overview[cum] = 0 if pd.isna(counts[cum]) else round(float(counts[cum]), 2)
+    return overview
+# endregion
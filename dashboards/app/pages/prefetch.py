@@ -0,0 +1,143 @@
+# region Import Modules
+import os
+import hmac
+import threading
+import concurrent.futures
+from flask import request, jsonify
+from dash.exceptions import PreventUpdate
+from .settings import load_settings
+from .query_client import submit_query
+from .case_snapshot import snapshot_paths, ensure_snapshot
+from .overview import build_overview_query, build_fit_info_query
+from .dropdowns import build_wells_dropdown_query, build_zones_dropdown_query
+from .leaderboards import build_leaderboard_query
+from .query_builder import production_sql, fit_sql
+from .time_windows import series_resolution
+# endregion
+
+# region Global Variables
+#Load Environment Variables
+settings = load_settings()
+
+#Aggregation and filters of the phase plots when the page opens
+default_agg = []
+default_filters = {
+    'WellAPI':[],
+    'Reservoir':[],
+    'Compartment':[],
+    'FaultBlock':[],
+}
+default_fit_percentiles = '25-75'
+
+_executor = None
+_executor_pid = None
+#Cases queued or being prefetched by this worker
+_scheduled = {}
+_lock = threading.Lock()
+# endregion
+
+
+# region Prefetch
+#Queries the case page sends as soon as it renders: the overview and fit cards, the
+#dropdowns, the ETL leaderboards, the production series shared by every phase plot and the fit
+#of the default oil plot
+def prefetch_queries(case_name):
+    return [
+        build_overview_query(case_name).get_sql(),
+        build_fit_info_query(case_name).get_sql(),
+        build_wells_dropdown_query(case_name).get_sql(),
+        build_zones_dropdown_query(case_name).get_sql(),
+        build_leaderboard_query(case_name).get_sql(),
+        production_sql(case_name, default_agg, default_filters, series_resolution()),
+        fit_sql(case_name, 'oil', default_agg, default_filters, default_fit_percentiles, series_resolution()),
+    ]
+
+#Send the queries of a case and wait for them so their results land in the query cache.
+#With the local engine the case snapshot is checked first, it answers once it's ready.
+def prefetch_case(case_name):
+    if settings['QUERY_ENGINE'] == 'local' and snapshot_paths(case_name) is not None:
+        return
+    if not settings['QUERY_CACHE_ENABLED']:
+        return
+    pending = [submit_query(q) for q in prefetch_queries(case_name)]
+    for p in pending:
+        try:
+            p.result()
+        except PreventUpdate:
+            #the callback sending the same query logs and handles the failure
+            pass
+
+#Thread pool of the prefetches of this worker, a forked worker gets its own
+def get_executor():
+    global _executor, _executor_pid
+    pid = os.getpid()
+    with _lock:
+        if _executor is None or _executor_pid != pid:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=settings['PREFETCH_WORKERS'],
+                thread_name_prefix='prefetch',
+            )
+            _executor_pid = pid
+            _scheduled.clear()
+    return _executor
+
+#Start prefetching a case in the background, returns the future of the prefetch.
+#Callbacks sending a query that is still being prefetched wait for the same request.
+def schedule_prefetch(case_name):
+    executor = get_executor()
+    with _lock:
+        future = _scheduled.get(case_name)
+        if future is None:
+            future = executor.submit(prefetch_case, case_name)
+            _scheduled[case_name] = future
+            future.add_done_callback(lambda f: _unschedule(case_name, f))
+    return future
+
+def _unschedule(case_name, future):
+    with _lock:
+        if _scheduled.get(case_name) is future:
+            del _scheduled[case_name]
+
+#Prefetch a case when its page route is resolved, before the browser asks for the data
+def prefetch_on_navigation(case_name):
+    if settings['PREFETCH_ENABLED']:
+        schedule_prefetch(case_name)
+# endregion
+
+
+# region Admin Endpoint
+#POST /admin/prewarm {"case_names": [...]} with the x-admin-token header warms the cache,
+#or the snapshots with the local engine, e.g. after new Aqueon runs are published.
+#?wait=true answers once every case is done, with the local engine once its snapshot is
+#built or the case is found to get none. The endpoint is off without ADMIN_TOKEN.
+#With the memory cache backend only the worker serving the request is warmed.
+def register_prewarm_route(server):
+    @server.route('/admin/prewarm', methods=['POST'])
+    def prewarm():
+        token = settings['ADMIN_TOKEN']
+        if not token:
+            return jsonify({'error':'prewarm endpoint disabled'}), 404
+        if not hmac.compare_digest(request.headers.get('x-admin-token', ''), token):
+            return jsonify({'error':'invalid admin token'}), 403
+        body = request.get_json(silent=True) or {}
+        case_names = body.get('case_names')
+        if not isinstance(case_names, list) or not all(isinstance(c, str) for c in case_names):
+            return jsonify({'error':'case_names must be a list of case names'}), 400
+
+        futures = {case_name: schedule_prefetch(case_name) for case_name in dict.fromkeys(case_names)}
+        if request.args.get('wait', 'false').lower() != 'true':
+            return jsonify({'scheduled':list(futures)}), 202
+
+        results = {}
+        for case_name, future in futures.items():
+            try:
+                future.result()
+                if settings['QUERY_ENGINE'] == 'local' and ensure_snapshot(case_name) is None:
+                    results[case_name] = 'no snapshot'
+                else:
+                    results[case_name] = 'ok'
+            except Exception as e:
+                print('prewarm failed', case_name, e)
+                results[case_name] = str(e)
+        return jsonify({'prewarmed':results}), 200
+# endregion
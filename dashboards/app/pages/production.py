@@ -0,0 +1,402 @@
+# region Import Modules
+from pypika import PostgreSQLQuery, Case, Field
+from pypika import functions as fn
+from .sql_utils import aqueon, distinct, make_date, date_trunc, production_date
+from .cumulative import cumulative, month_parts
+# endregion
+
+
+# region Production Time Series
+#Rate column of every phase in productiondata, gross is oil plus water
+phase_columns = {
+    'oil':'Qo',
+    'water':'Qw',
+    'gas':'Qg',
+    'injectant':'Qs',
+}
+
+#Status of the wells plotted in each phase
+producer_status = 1
+injector_status = 2
+
+#Production columns summed for the actual volumes of every phase
+actual_columns = {
+    'oil':['Qo'],
+    'gross':['Qo','Qw'],
+    'water':['Qw'],
+    'gas':['Qg'],
+    'injectant':['Qs'],
+}
+
+#Fit rate of every phase from the P-value columns of its timestep table, as (column, sign)
+#terms where {p} is the percentile, e.g. water is gross minus oil. A new phase is a new
+#entry here instead of a new query branch.
+fit_phases = {
+    'oil':{'table':'producer_timestep', 'rate':[('OilRate{p}', 1)]},
+    'gross':{'table':'producer_timestep', 'rate':[('GrossRate{p}', 1)]},
+    'water':{'table':'producer_timestep', 'rate':[('GrossRate{p}', 1), ('OilRate{p}', -1)]},
+    'gas':{'table':'producer_timestep', 'rate':[('GasRate{p}', 1)]},
+    'injectant':{'table':'injector_timestep', 'rate':[('InjectantRate{p}', 1)]},
+}
+
+#Columns of the production series averaged over the months of a coarse period.
+#The row counters are summed, select_phase still finds the producer and injector rows.
+production_averages = ['oil','water','gas','gross','injectant','wellcount','bhp','injectant_wellcount','injectant_bhp']
+production_counters = ['producer_rows','injector_rows']
+
+#Monthly production of every phase for the current filters and aggregation.
+#Producer and injector rows are split with conditional aggregates so one query
+#feeds the oil, gross, water, gas and injectant plots, and the result is cached
+#by the query cache for every phase of the same filter state.
+#window (first, last) keeps only the months between two dates, e.g. the zoomed years of a plot.
+def build_production_query(case_name, agg, filters, window=None):
+    productiondata = aqueon.productiondata
+    completiondata = aqueon.completiondata
+
+    date_col = production_date(productiondata).as_('date')
+    status = getattr(productiondata, 'Status')
+    is_producer = status == producer_status
+    is_injector = status == injector_status
+
+    #010-real_production_data_base.sql
+    query = PostgreSQLQuery.from_(
+        productiondata
+    ).where(
+        getattr(productiondata, 'casename') == case_name
+    ).where(
+        status.isin([producer_status, injector_status])
+    ).left_join(
+        completiondata
+    ).on(
+        (productiondata.WellAPI == completiondata.WellAPI) &
+        (productiondata.casename == completiondata.casename) &
+        (productiondata.CompSubId == completiondata.CompSubId)
+    )
+
+    #If there's no aggregation just group by date
+    if len(agg)==0:
+        agg_cols = []
+        select_agg_cols = [fn.LiteralValue("'field'").as_('field')]
+    else:
+        agg_cols = [getattr(completiondata,i) for i in agg]
+        select_agg_cols = agg_cols
+
+    phase_sums = [
+        fn.Sum(Case().when(is_producer, getattr(productiondata, col))).as_(phase)
+        for phase, col in phase_columns.items() if phase != 'injectant'
+    ]
+    query = query.select(
+        date_col,
+        *select_agg_cols,
+        *phase_sums,
+        fn.Sum(Case().when(
+            is_producer, getattr(productiondata, phase_columns['oil']) + getattr(productiondata, phase_columns['water'])
+        )).as_('gross'),
+        fn.Sum(Case().when(is_injector, getattr(productiondata, phase_columns['injectant']))).as_('injectant'),
+        fn.Count(distinct(Case().when(is_producer, getattr(productiondata, 'WellAPI')))).as_('wellcount'),
+        fn.Avg(Case().when(is_producer, getattr(productiondata, 'BHP'))).as_('bhp'),
+        fn.Count(distinct(Case().when(is_injector, getattr(productiondata, 'WellAPI')))).as_('injectant_wellcount'),
+        fn.Avg(Case().when(is_injector, getattr(productiondata, 'BHP'))).as_('injectant_bhp'),
+        fn.Sum(Case().when(is_producer, 1).else_(0)).as_('producer_rows'),
+        fn.Sum(Case().when(is_injector, 1).else_(0)).as_('injector_rows'),
+    ).groupby(
+        date_col,
+        *agg_cols
+    ).orderby(
+        *agg_cols,
+        date_col
+    )
+
+    #iterate over the filters and add them to the query
+    for k,f in filters.items():
+        #check if the filter is not empty to add filter to the query
+        if len(f)>0:
+            query = query.where(
+                getattr(completiondata,k).isin(f)
+            )
+    if window is not None:
+        query = query.where(production_date(productiondata).between(*window))
+    return query
+
+#Fit rate of a phase at a percentile, e.g. percentile 'P50'
+def fit_rate(fit_timestep, phase, percentile):
+    rate = None
+    for column, sign in fit_phases[phase]['rate']:
+        term = getattr(fit_timestep, column.format(p=percentile))
+        if rate is None:
+            rate = term
+        else:
+            rate = rate + term if sign > 0 else rate - term
+    return rate
+
+#Fit timestep rows of a case joined to their completion and the fit info of the case
+def fit_query_base(case_name, phase):
+    completiondata = aqueon.completiondata
+    fit_info = aqueon.fit_info
+    fit_timestep = getattr(aqueon, fit_phases[phase]['table'])
+    return PostgreSQLQuery.from_(
+        fit_timestep
+    ).where(
+        getattr(fit_timestep, 'casename') == case_name
+    ).left_join(
+        completiondata
+    ).on(
+        (fit_timestep.WellId == completiondata.WellAPI) &
+        (fit_timestep.casename == completiondata.casename) &
+        (fn.Cast(fit_timestep.CompletionId,'INTEGER') == fn.Cast(completiondata.CompSubId,'INTEGER'))
+    ).left_join(
+        fit_info
+    ).on(
+        fit_timestep.casename == fit_info.casename
+    )
+
+#Fitted rates of a phase at P50 and the lower and upper percentiles for the current
+#filters and aggregation, split in training and validation for backtests
+def build_fit_query(case_name, phase, agg, filters, p_lower, p_upper, window=None):
+    completiondata = aqueon.completiondata
+    fit_info = aqueon.fit_info
+    fit_timestep = getattr(aqueon, fit_phases[phase]['table'])
+    date_col = getattr(fit_timestep, 'Date').as_('date')
+
+    case_clause = Case().when(
+        getattr(fit_info,'IsBacktest') == True,
+        Case()
+            .when(getattr(fit_info,'BacktestEndDate') >= getattr(fit_timestep, 'Date'),'training')
+            .else_('validation')
+        ).else_('training').as_('type_of_fit')
+
+    #If there's no aggregation just group by date
+    if len(agg)==0:
+        agg_cols = []
+        select_agg_cols = [fn.LiteralValue("'field'").as_('field')]
+    else:
+        agg_cols = [getattr(completiondata,i) for i in agg]
+        select_agg_cols = agg_cols
+
+    query = fit_query_base(case_name, phase).select(
+        date_col,
+        *select_agg_cols,
+        case_clause,
+        *[
+            fn.Sum(fit_rate(fit_timestep, phase, f'P{p}')).as_(f'{phase}_rate_p{p}')
+            for p in ['50', p_lower, p_upper]
+        ]
+    ).groupby(
+        date_col,
+        *agg_cols,
+        case_clause
+    ).orderby(
+        *agg_cols,
+        date_col
+    )
+
+    for k,f in filters.items():
+        if len(f)>0:
+            query = query.where(
+                getattr(completiondata,k).isin(f)
+            )
+    if window is not None:
+        query = query.where(getattr(fit_timestep, 'Date').between(*window))
+    return query
+
+#Monthly series averaged over a coarser period like 'quarter' or 'year', one row per
+#period and group. The period is grouped by its expression, in Postgres a GROUP BY "date"
+#would pick the monthly date of the subquery over the output column.
+def build_coarse_query(monthly, keys, averaged, summed, resolution):
+    sub = monthly.as_('monthly')
+    period = fn.Cast(date_trunc(resolution, getattr(sub, 'date')), 'DATE')
+    #getattr would return the field method of pypika for the 'field' column
+    key_cols = [Field(k, table=sub) for k in keys]
+    return PostgreSQLQuery.from_(
+        sub
+    ).select(
+        period.as_('date'),
+        *key_cols,
+        *[fn.Avg(getattr(sub, c)).as_(c) for c in averaged],
+        *[fn.Sum(getattr(sub, c)).as_(c) for c in summed],
+    ).groupby(
+        period,
+        *key_cols
+    ).orderby(
+        *key_cols,
+        period
+    )
+
+#Whole history of the production series at a coarse resolution, see build_production_query
+def build_coarse_production_query(case_name, agg, filters, resolution):
+    monthly = build_production_query(case_name, agg, filters)
+    keys = agg if len(agg)>0 else ['field']
+    return build_coarse_query(monthly, keys, production_averages, production_counters, resolution)
+
+#Whole history of the fitted rates at a coarse resolution, see build_fit_query
+def build_coarse_fit_query(case_name, phase, agg, filters, p_lower, p_upper, resolution):
+    monthly = build_fit_query(case_name, phase, agg, filters, p_lower, p_upper)
+    keys = (agg if len(agg)>0 else ['field']) + ['type_of_fit']
+    rates = list(dict.fromkeys(f'{phase}_rate_p{p}' for p in ['50', p_lower, p_upper]))
+    return build_coarse_query(monthly, keys, rates, [], resolution)
+
+#Rows of the production time series plotted for a phase.
+#Injector wellcount and BHP take the place of the producer ones for the injectant plot.
+def select_phase(df, phase):
+    if phase == 'injectant':
+        df = df.loc[df['injector_rows']>0].drop(columns=['wellcount','bhp'])
+        df = df.rename(columns={'injectant_wellcount':'wellcount','injectant_bhp':'bhp'})
+    else:
+        df = df.loc[df['producer_rows']>0].drop(columns=['injectant_wellcount','injectant_bhp'])
+    return df.drop(columns=['producer_rows','injector_rows'])
+# endregion
+
+
+# region Rollups
+#Levels of the rollup tables materialized with every case snapshot, as sorted column tuples.
+#Each one holds the production series of build_production_query grouped by its columns.
+rollup_levels = [
+    (),
+    ('Compartment',),
+    ('FaultBlock',),
+    ('Reservoir',),
+    ('WellAPI',),
+    ('FaultBlock','Reservoir'),
+    ('Compartment','Reservoir'),
+    ('Compartment','FaultBlock'),
+    ('Compartment','FaultBlock','Reservoir'),
+]
+
+#Table name of a rollup level, e.g. rollup_faultblock_reservoir
+def rollup_table(level):
+    return 'rollup_' + ('_'.join(k.lower() for k in level) or 'field')
+
+#Rollup level answering a production query, None when there's none. Rows of a level can't
+#be grouped again for the well counts, so the level must be the aggregation itself
+#and only the aggregated columns can be filtered.
+def rollup_level(agg, filter_cols):
+    level = tuple(sorted(agg))
+    if level not in rollup_levels or not set(filter_cols) <= set(agg):
+        return None
+    return level
+
+#Statements materializing the rollup tables of a case from its tables
+def build_rollup_queries(case_name):
+    return {rollup_table(level): build_production_query(case_name, list(level), {}) for level in rollup_levels}
+
+#build_production_query answered from a rollup table, same columns in the same order
+def build_rollup_query(agg, filters, window=None):
+    table = getattr(aqueon, rollup_table(rollup_level(agg, [k for k,f in filters.items() if len(f)>0])))
+    keys = agg if len(agg)>0 else ['field']
+    query = PostgreSQLQuery.from_(
+        table
+    ).select(
+        getattr(table, 'date'),
+        *[Field(k, table=table) for k in keys],
+        *[getattr(table, c) for c in production_averages + production_counters]
+    ).orderby(
+        *[getattr(table, k) for k in agg],
+        getattr(table, 'date')
+    )
+    for k,f in filters.items():
+        if len(f)>0:
+            query = query.where(
+                getattr(table,k).isin(f)
+            )
+    if window is not None:
+        query = query.where(getattr(table, 'date').between(*window))
+    return query
+
+#build_coarse_production_query answered from a rollup table
+def build_coarse_rollup_query(agg, filters, resolution):
+    keys = agg if len(agg)>0 else ['field']
+    return build_coarse_query(build_rollup_query(agg, filters), keys, production_averages, production_counters, resolution)
+# endregion
+
+
+# region Crossplot
+#Columns the actual and fit cumulatives of the crossplot are grouped and joined by
+def crossplot_columns(agg, include_wells):
+    if len(agg)==0:
+        return ['WellAPI','WellName','Reservoir']
+    if include_wells:
+        return list(dict.fromkeys(agg+['WellAPI','WellName']))
+    return list(dict.fromkeys(agg))
+
+#Actual and fitted cumulatives of a phase after the backtest end date, joined by group.
+#filters restrict both sides, pass no filters to keep the unselected groups.
+def build_crossplot_query(case_name, phase, agg, include_wells, filters):
+    productiondata = aqueon.productiondata
+    completiondata = aqueon.completiondata
+    fit_info = aqueon.fit_info
+    fit_timestep = getattr(aqueon, fit_phases[phase]['table'])
+
+    join_agg = crossplot_columns(agg, include_wells)
+    agg_cols = [getattr(completiondata,i) for i in join_agg]
+
+    #make the date column
+    date_col = make_date(
+        getattr(productiondata, 'Year'),
+        getattr(productiondata, 'Month'),
+        1
+    ).as_('date')
+
+    #actual query
+    actual_rate = None
+    for col in actual_columns[phase]:
+        rate = getattr(productiondata, col)
+        actual_rate = rate if actual_rate is None else actual_rate + rate
+    query_actual = PostgreSQLQuery.from_(
+        productiondata
+    ).left_join(
+        completiondata
+    ).on(
+        (productiondata.WellAPI == completiondata.WellAPI) &
+        (productiondata.casename == completiondata.casename) &
+        (productiondata.CompSubId == completiondata.CompSubId)
+    ).left_join(
+        fit_info
+    ).on(
+        fit_info.casename == productiondata.casename
+    ).where(
+        getattr(productiondata, 'casename') == case_name
+    ).where(
+        getattr(fit_info,'BacktestEndDate') < date_col
+    ).select(
+        *agg_cols,
+        cumulative(actual_rate, getattr(productiondata, 'Year'), getattr(productiondata, 'Month'), 1e-3).as_(f'actual_{phase}'),
+        fn.Avg(getattr(completiondata,'Netpay')).as_('netpay')
+    ).groupby(
+        *agg_cols
+    )
+
+    #fit query
+    query_fit = fit_query_base(case_name, phase).where(
+        getattr(fit_info,'BacktestEndDate') < getattr(fit_timestep, 'Date')
+    ).select(
+        *agg_cols,
+        cumulative(fit_rate(fit_timestep, phase, 'P50'), *month_parts(getattr(fit_timestep, 'Date')), 1e-3).as_(f'fit_{phase}')
+    ).groupby(
+        *agg_cols
+    )
+
+    #iterate over the filters and add them to both queries
+    for k,f in filters.items():
+        if len(f)>0:
+            query_actual = query_actual.where(
+                getattr(completiondata,k).isin(f)
+            )
+            query_fit = query_fit.where(
+                getattr(completiondata,k).isin(f)
+            )
+
+    actual = query_actual.as_('actual')
+    fit = query_fit.as_('fit')
+    return PostgreSQLQuery.from_(
+        actual
+    ).select(
+        *[getattr(actual,i) for i in join_agg],
+        getattr(actual,f'actual_{phase}'),
+        getattr(fit,f'fit_{phase}'),
+        getattr(actual,'netpay')
+    ).inner_join(
+        fit
+    ).using(
+        *join_agg
+    )
+# endregion
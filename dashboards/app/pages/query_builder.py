@@ -0,0 +1,135 @@
+# region Import Modules
+import re
+from functools import lru_cache
+from pypika import Parameter
+from .production import build_production_query, build_fit_query, build_crossplot_query
+from .production import build_coarse_production_query, build_coarse_fit_query
+from .production import rollup_level, build_rollup_query, build_coarse_rollup_query
+# endregion
+
+# region Global Variables
+#Filter columns of completiondata, in the order their conditions are written
+filter_columns = ['WellAPI', 'Reservoir', 'Compartment', 'FaultBlock']
+
+#Templates kept per worker, one per query shape
+template_cache_size = 512
+
+_placeholder_pattern = re.compile(r':\{(\w+)\}')
+# endregion
+
+
+# region Parameters
+#Placeholder of a template parameter, rendered as :{name}
+def placeholder(name):
+    return Parameter(f':{{{name}}}')
+
+#Filters with every list sorted and without duplicates, empty filters dropped.
+#Equivalent selections give the same statement and the same query cache key.
+def canonical_filters(filters):
+    return {
+        k: sorted(set(filters[k]), key=lambda v: (str(type(v)), v))
+        for k in filter_columns if len(filters.get(k) or [])>0
+    }
+
+#SQL literal of a parameter value, lists become a comma separated list for IN
+def sql_literal(value):
+    if isinstance(value, (list, tuple)):
+        return ','.join(sql_literal(v) for v in value)
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+# endregion
+
+
+# region Templates
+#SQL of a query shape with placeholders for the case name and the filter lists.
+#The Data Explorer API takes plain SQL text, so the parameters are bound on our side.
+#Binding is a single pass over the text instead of a new walk over pypika objects.
+class QueryTemplate:
+    def __init__(self, name, query):
+        self.name = name
+        self.sql = query.get_sql()
+        self.params = sorted(set(_placeholder_pattern.findall(self.sql)))
+
+    def bind(self, params):
+        return _placeholder_pattern.sub(lambda m: sql_literal(params[m.group(1)]), self.sql)
+
+#Filters of a template, one placeholder per filtered column
+def template_filters(filter_cols):
+    return {k: [placeholder(k)] for k in filter_cols}
+
+#Placeholders of the first and last date of a window
+def template_window(windowed):
+    return (placeholder('window_start'), placeholder('window_end')) if windowed else None
+
+#resolution is the period of a coarse whole history series, None for monthly rows
+@lru_cache(maxsize=template_cache_size)
+def production_template(agg, filter_cols, resolution=None, windowed=False):
+    if resolution is not None:
+        query = build_coarse_production_query(placeholder('case_name'), list(agg), template_filters(filter_cols), resolution)
+    else:
+        query = build_production_query(placeholder('case_name'), list(agg), template_filters(filter_cols), template_window(windowed))
+    return QueryTemplate('production', query)
+
+@lru_cache(maxsize=template_cache_size)
+def fit_template(phase, agg, filter_cols, p_lower, p_upper, resolution=None, windowed=False):
+    if resolution is not None:
+        query = build_coarse_fit_query(placeholder('case_name'), phase, list(agg), template_filters(filter_cols), p_lower, p_upper, resolution)
+    else:
+        query = build_fit_query(placeholder('case_name'), phase, list(agg), template_filters(filter_cols), p_lower, p_upper, template_window(windowed))
+    return QueryTemplate(f'fit_{phase}', query)
+
+@lru_cache(maxsize=template_cache_size)
+def rollup_template(agg, filter_cols, resolution=None, windowed=False):
+    if resolution is not None:
+        query = build_coarse_rollup_query(list(agg), template_filters(filter_cols), resolution)
+    else:
+        query = build_rollup_query(list(agg), template_filters(filter_cols), template_window(windowed))
+    return QueryTemplate('rollup', query)
+
+@lru_cache(maxsize=template_cache_size)
+def crossplot_template(phase, agg, include_wells, filter_cols):
+    query = build_crossplot_query(placeholder('case_name'), phase, list(agg), include_wells, template_filters(filter_cols))
+    return QueryTemplate(f'crossplot_{phase}', query)
+# endregion
+
+
+# region Bound Queries
+#Parameters of a query, window is the first and last date like ('2010-01-01', '2012-12-31')
+def query_params(case_name, filters, window=None):
+    params = {'case_name':case_name, **filters}
+    if window is not None:
+        params['window_start'], params['window_end'] = window
+    return params
+
+#Production time series of every phase, see production.build_production_query.
+#resolution gives the coarse whole history, window the monthly rows between two dates.
+def production_sql(case_name, agg, filters, resolution=None, window=None):
+    filters = canonical_filters(filters)
+    template = production_template(tuple(agg), tuple(filters), resolution, window is not None)
+    return template.bind(query_params(case_name, filters, window))
+
+#production_sql answered from the rollup tables of a case snapshot, for the local engine only.
+#None when no rollup level matches the aggregation and filters.
+def rollup_sql(agg, filters, resolution=None, window=None):
+    filters = canonical_filters(filters)
+    if rollup_level(agg, filters) is None:
+        return None
+    template = rollup_template(tuple(agg), tuple(filters), resolution, window is not None)
+    return template.bind(query_params(None, filters, window))
+
+#Fitted rates of a phase, fit_percentiles is the lower and upper percentile like '10-90'
+def fit_sql(case_name, phase, agg, filters, fit_percentiles, resolution=None, window=None):
+    p_lower, p_upper = fit_percentiles.split('-')
+    filters = canonical_filters(filters)
+    template = fit_template(phase, tuple(agg), tuple(filters), p_lower, p_upper, resolution, window is not None)
+    return template.bind(query_params(case_name, filters, window))
+
+#Actual and fitted cumulatives of the crossplot, filters restrict it to the selected groups
+def crossplot_sql(case_name, phase, agg, include_wells, filters):
+    filters = canonical_filters(filters)
+    template = crossplot_template(phase, tuple(agg), bool(include_wells), tuple(filters))
+    return template.bind(query_params(case_name, filters))
+# endregion
@@ -0,0 +1,94 @@
+# region Import Modules
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+# endregion
+
+
+# region Key Functions
+#Quoted literals are kept as they are, whitespace between tokens is collapsed
+_literal_pattern = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+
+#Normalize a SQL statement so equivalent query strings share the same key
+def normalize_sql(query_str):
+    parts = _literal_pattern.split(query_str.strip())
+    for i in range(0, len(parts), 2):
+        parts[i] = ' '.join(parts[i].split())
+    return ''.join(parts)
+
+#Cache key of a query for a customer and originator
+def make_key(query_str, customer, originator):
+    raw = '\n'.join([str(customer), str(originator), normalize_sql(query_str)])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+# endregion
+
+
+# region Cache
+#In-process query result cache with a per entry TTL and LRU eviction.
+#Results are DataFrames charged by their memory usage against max_bytes.
+#Every worker keeps its own copy, see cache_backends.py for shared backends.
+class QueryCache:
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, expires = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        #callers are free to modify the frame they get back
+        return value.copy()
+
+    def set(self, key, df):
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        #entries bigger than the whole budget are never cached
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (df.copy(), size, time.monotonic() + self.ttl)
+            self._nbytes += size
+            while self._nbytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend':'memory',
+                'entries':len(self._entries),
+                'bytes':self._nbytes,
+                'max_bytes':self.max_bytes,
+                'hits':self.hits,
+                'misses':self.misses,
+                'evictions':self.evictions,
+            }
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._nbytes -= size
+# endregion
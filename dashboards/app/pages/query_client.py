@@ -0,0 +1,499 @@
+# region Import Modules
+import os
+import io
+import json
+import codecs
+import asyncio
+import threading
+import concurrent.futures
+import httpx
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dash.exceptions import PreventUpdate
+from .settings import load_settings
+from .query_cache import make_key
+from .cache_backends import create_query_cache, arrow_errors
+# endregion
+
+# region Global Variables
+#Load Environment Variables
+settings = load_settings()
+
+#Data Explorer query endpoint
+api_url = settings['API_URL']
+query_url = f'{api_url}/dataexplorer/query/tachyus'
+
+#Media types of the columnar response formats
+arrow_stream_type = 'application/vnd.apache.arrow.stream'
+arrow_file_type = 'application/vnd.apache.arrow.file'
+parquet_type = 'application/vnd.apache.parquet'
+
+#Accept header for each API_RESPONSE_FORMAT, the API answers JSON when it doesn't offer the preferred one
+accept_formats = {
+    'arrow':f'{arrow_stream_type};q=1.0,{arrow_file_type};q=0.95,{parquet_type};q=0.9,application/json;q=0.8,*/*;q=0.1',
+    'parquet':f'{parquet_type};q=1.0,{arrow_stream_type};q=0.95,{arrow_file_type};q=0.9,application/json;q=0.8,*/*;q=0.1',
+    'json':'application/json;q=1.0,*/*;q=0.8',
+}
+
+#Streamed responses can only be parsed incrementally as an Arrow IPC stream or a JSON array
+stream_accept = f'{arrow_stream_type};q=1.0,application/json;q=0.8,*/*;q=0.1'
+if settings['API_RESPONSE_FORMAT'] == 'json':
+    stream_accept = accept_formats['json']
+
+#Chunks of a streamed response buffered between the socket and the parser
+stream_queue_size = 8
+stream_read_size = 64 * 1024
+
+#Database Connection Headers to API
+headers = {
+    'x-api-key': settings['API_KEY'],
+    'customer': settings['API_CUSTOMER'],
+    'originator': settings['API_ORIGINATOR'],
+    'Content-Type': 'text/plain',
+    'Accept': accept_formats[settings['API_RESPONSE_FORMAT']]
+}
+
+#Pool limits are per process, so every gunicorn worker gets its own pool
+limits = httpx.Limits(
+    max_connections=settings['API_MAX_CONNECTIONS'],
+    max_keepalive_connections=settings['API_MAX_KEEPALIVE_CONNECTIONS'],
+    keepalive_expiry=settings['API_KEEPALIVE_EXPIRY'],
+)
+timeout = httpx.Timeout(settings['API_TIMEOUT'])
+
+_loop = None
+_loop_pid = None
+_client = None
+_client_lock = threading.Lock()
+
+#Cacheable requests in flight by cache key, a query sent again before its response arrived
+#(e.g. by a callback while the prefetch of the page is running) waits for the same request
+_inflight = {}
+_inflight_lock = threading.RLock()
+
+#Query results are shared by every user, case outputs don't change once published.
+#The memory backend is per worker, the file and redis backends are shared by the pod.
+query_cache = create_query_cache(settings)
+# endregion
+
+
+# region Response Formats
+#Build a DataFrame from an Arrow table. Numeric columns without nulls are
+#wrapped without copying, dates keep a datetime64 dtype instead of objects.
+def table_to_frame(table):
+    return table.to_pandas(split_blocks=True, self_destruct=True, date_as_object=False)
+
+#Media type of a response without its parameters
+def response_content_type(response):
+    return response.headers.get('content-type', '').split(';')[0].strip().lower()
+
+#Read a DataFrame from a body in one of the columnar formats
+def columnar_to_frame(content_type, content):
+    buf = pa.py_buffer(content)
+    try:
+        if content_type == arrow_stream_type:
+            table = pa.ipc.open_stream(buf).read_all()
+        elif content_type == arrow_file_type:
+            table = pa.ipc.open_file(buf).read_all()
+        else:
+            table = pq.read_table(pa.BufferReader(buf))
+    except arrow_errors as e:
+        print('invalid columnar response', content_type, e)
+        raise PreventUpdate
+    return table_to_frame(table)
+
+#Parse a Data Explorer response according to the format the API answered with.
+#Columnar formats are read straight from the response buffer, anything else is JSON.
+def response_to_frame(response):
+    content_type = response_content_type(response)
+    if content_type in (arrow_stream_type, arrow_file_type, parquet_type):
+        return columnar_to_frame(content_type, response.content)
+    return pd.DataFrame(response.json())
+# endregion
+
+
+# region Client
+#Return the process-wide event loop that runs every Data Explorer request.
+#The loop lives on a daemon thread: callback threads hand it their queries and
+#wait, while one async client multiplexes all the in-flight requests of the worker.
+#The pid check makes sure a forked worker never reuses the parent's loop or sockets.
+def get_loop():
+    global _loop, _loop_pid, _client
+    pid = os.getpid()
+    if _loop is None or _loop_pid != pid:
+        with _client_lock:
+            if _loop is None or _loop_pid != pid:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='query-client', daemon=True).start()
+                _client = httpx.AsyncClient(
+                    headers=headers,
+                    limits=limits,
+                    timeout=timeout,
+                    http2=settings['API_HTTP2'],
+                )
+                _loop = loop
+                _loop_pid = pid
+    return _loop
+
+#Close the pooled connections and stop the loop, called from the gunicorn worker_exit hook
+def close_client():
+    global _loop, _loop_pid, _client
+    with _client_lock:
+        if _loop is not None and _loop_pid == os.getpid():
+            asyncio.run_coroutine_threadsafe(_client.aclose(), _loop).result()
+            _loop.call_soon_threadsafe(_loop.stop)
+        _loop = None
+        _loop_pid = None
+        _client = None
+
+#Run a coroutine on the query loop and wait for its result from the calling thread
+def run_on_loop(coro):
+    loop = get_loop()
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+#Send a SQL statement to the Data Explorer API through the shared pool
+async def post_query_async(query_str):
+    return await _client.post(query_url, content=query_str)
+
+#DataFrame of a query response, stored in the query cache under key.
+#Failed queries are logged and stop the callback like the rest of the page does.
+def parse_response(query_str, key, response):
+    if response.status_code != 200:
+        print(response.status_code,response.text)
+        print(query_str)
+        raise PreventUpdate
+    df = response_to_frame(response)
+    if key is not None:
+        query_cache.set(key, df)
+    return df
+
+#A query sent to the loop that the caller collects later with result().
+#Cached queries are resolved right away without touching the API.
+class PendingQuery:
+    def __init__(self, query_str, key, df=None, future=None, shared=None):
+        self.query_str = query_str
+        self.key = key
+        self._df = df
+        self._future = future
+        self._shared = shared
+
+    #Wait for the response and return it as a DataFrame.
+    #The response of a shared request is parsed once for all of its callers.
+    def result(self):
+        if self._df is None:
+            try:
+                response = self._future.result()
+            except concurrent.futures.CancelledError:
+                print('query cancelled')
+                print(self.query_str)
+                raise PreventUpdate
+            if self._shared is not None:
+                self._df = self._shared.frame(response)
+            else:
+                self._df = parse_response(self.query_str, self.key, response)
+        return self._df
+
+    #Abort the request, the open connection is closed instead of waiting for the response.
+    #A thread waiting in result() is woken up and stops its callback.
+    def cancel(self):
+        if self._future is not None:
+            self._future.cancel()
+
+#A request shared by every caller that sends the same query while it is in flight.
+#Each caller waits on a future of its own, so cancelling one caller wakes only that one.
+#The request itself is cancelled once none of its callers waits for it anymore, it is
+#taken out of the in-flight requests first so no new caller joins it.
+class SharedRequest:
+    def __init__(self, query_str, key, future):
+        self.query_str = query_str
+        self.key = key
+        self.future = future
+        self.waiters = 0
+        self._df = None
+        self._failed = False
+        self._parse_lock = threading.Lock()
+
+    def _done(self, future):
+        with _inflight_lock:
+            self._leave_inflight()
+
+    #the in-flight lock must be held
+    def _leave_inflight(self):
+        if _inflight.get(self.key) is self:
+            del _inflight[self.key]
+
+    #Future of one more caller, resolved with the response of the request.
+    #The in-flight lock must be held, so the request can't be abandoned meanwhile.
+    def join(self):
+        waiter = concurrent.futures.Future()
+        self.waiters += 1
+
+        def relay(future):
+            try:
+                if future.cancelled():
+                    waiter.cancel()
+                elif future.exception() is not None:
+                    waiter.set_exception(future.exception())
+                else:
+                    waiter.set_result(future.result())
+            except concurrent.futures.InvalidStateError:
+                #the caller cancelled its waiter first
+                pass
+
+        def leave(waiter):
+            if waiter.cancelled():
+                with _inflight_lock:
+                    self.waiters -= 1
+                    last = self.waiters == 0
+                    if last:
+                        self._leave_inflight()
+                if last:
+                    self.future.cancel()
+
+        waiter.add_done_callback(leave)
+        self.future.add_done_callback(relay)
+        return waiter
+
+    #DataFrame of the response, parsed by the first caller and copied for every caller
+    #since they are free to modify it
+    def frame(self, response):
+        with self._parse_lock:
+            if self._df is None and not self._failed:
+                try:
+                    self._df = parse_response(self.query_str, self.key, response)
+                except Exception:
+                    self._failed = True
+                    raise
+            if self._failed:
+                raise PreventUpdate
+            return self._df.copy()
+
+#Send a query without waiting for its response.
+#cache=False always asks the API, for queries whose answer can change like case versions.
+def submit_query(query_str, cache=True):
+    key = None
+    if settings['QUERY_CACHE_ENABLED'] and cache:
+        key = make_key(query_str, headers['customer'], headers['originator'])
+        df = query_cache.get(key)
+        if df is not None:
+            return PendingQuery(query_str, key, df=df)
+    if key is None:
+        future = asyncio.run_coroutine_threadsafe(post_query_async(query_str), get_loop())
+        return PendingQuery(query_str, key, future=future)
+    with _inflight_lock:
+        shared = _inflight.get(key)
+        if shared is None:
+            shared = SharedRequest(query_str, key, asyncio.run_coroutine_threadsafe(post_query_async(query_str), get_loop()))
+            _inflight[key] = shared
+            #added once in place, a request already done is taken out right away
+            shared.future.add_done_callback(shared._done)
+        waiter = shared.join()
+    return PendingQuery(query_str, key, future=waiter, shared=shared)
+
+#Run several queries concurrently and return their results as DataFrames, in order
+def run_queries(*query_strs):
+    pending = [submit_query(q) for q in query_strs]
+    return [p.result() for p in pending]
+
+#Run a query and return its result as a DataFrame, served from the query cache when possible
+def run_query(query_str, cache=True):
+    return submit_query(query_str, cache).result()
+# endregion
+
+
+# region Streaming
+#Send a SQL statement and hand the response body to the callback thread chunk by chunk.
+#The queue is bounded, so the loop stops reading from the socket while the parser is
+#behind and only a few chunks of the body are held in memory at any time.
+async def stream_query_async(query_str, queue):
+    try:
+        async with _client.stream('POST', query_url, content=query_str, headers={'Accept':stream_accept}) as response:
+            if response.status_code != 200:
+                await response.aread()
+            await queue.put(response)
+            if response.status_code == 200:
+                async for chunk in response.aiter_bytes(stream_read_size):
+                    await queue.put(chunk)
+    except httpx.HTTPError as e:
+        await queue.put(e)
+    await queue.put(None)
+
+#Put in the queue of a streamed query that was cancelled, in place of the rest of the body
+class QueryCancelled(Exception):
+    pass
+
+#File object over the chunks of a streamed response, read from the callback thread
+class ResponseStream(io.RawIOBase):
+    def __init__(self, queue, loop):
+        self._queue = queue
+        self._loop = loop
+        self._buffer = memoryview(b'')
+        self._eof = False
+        self.response = self._next()
+
+    def _next(self):
+        item = asyncio.run_coroutine_threadsafe(self._queue.get(), self._loop).result()
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while len(self._buffer) == 0 and not self._eof:
+            chunk = self._next()
+            if chunk is None:
+                self._eof = True
+            else:
+                self._buffer = memoryview(chunk)
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+#Parse a JSON array of records incrementally, one DataFrame every chunk_rows records.
+#Bodies that aren't an array of records are parsed at once like a regular response.
+def iter_json_chunks(stream, chunk_rows):
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    text = ''
+    pos = 0
+    started = False
+    records = []
+    while True:
+        data = stream.read(stream_read_size)
+        eof = not data
+        text = text[pos:] + text_decoder.decode(data, final=eof)
+        pos = 0
+        done = False
+        while True:
+            while pos < len(text) and text[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(text):
+                break
+            if not started:
+                if text[pos] != '[':
+                    yield pd.DataFrame(json.loads(text[pos:] + text_decoder.decode(stream.read(), final=True)))
+                    return
+                started = True
+                pos += 1
+                continue
+            if text[pos] == ']':
+                done = True
+                break
+            try:
+                record, pos = decoder.raw_decode(text, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                #the record continues in the next chunk
+                break
+            records.append(record)
+            if len(records) >= chunk_rows:
+                yield pd.DataFrame(records)
+                records = []
+        if done or eof:
+            break
+    if records:
+        yield pd.DataFrame(records)
+
+#Parse a streamed response as DataFrames of at most chunk_rows rows
+def iter_response_chunks(stream, chunk_rows):
+    content_type = response_content_type(stream.response)
+    if content_type == arrow_stream_type:
+        try:
+            #arrow expects reads to return every byte asked for, not what the socket had
+            for batch in pa.ipc.open_stream(io.BufferedReader(stream, stream_read_size)):
+                for offset in range(0, batch.num_rows, chunk_rows):
+                    yield table_to_frame(pa.Table.from_batches([batch.slice(offset, chunk_rows)]))
+        except arrow_errors as e:
+            print('invalid columnar response', content_type, e)
+            raise PreventUpdate
+    elif content_type in (arrow_file_type, parquet_type):
+        #formats with a footer can't be read before the whole body arrived
+        df = columnar_to_frame(content_type, stream.read())
+        for offset in range(0, len(df), chunk_rows):
+            yield df.iloc[offset:offset + chunk_rows]
+    else:
+        yield from iter_json_chunks(stream, chunk_rows)
+
+#A query whose response is parsed while it is downloaded, keeping at most max_rows rows.
+#The request is sent right away, the body is read when result() is called.
+class StreamingQuery:
+    def __init__(self, query_str, key, max_rows, chunk_rows):
+        self.query_str = query_str
+        self.key = key
+        self.max_rows = max_rows
+        self.chunk_rows = chunk_rows
+        self.truncated = False
+        self._df = None
+        self._loop = get_loop()
+        self._queue = asyncio.Queue(maxsize=stream_queue_size)
+        self._future = asyncio.run_coroutine_threadsafe(stream_query_async(query_str, self._queue), self._loop)
+
+    def result(self):
+        if self._df is not None:
+            return self._df
+        try:
+            stream = ResponseStream(self._queue, self._loop)
+            response = stream.response
+            if response.status_code != 200:
+                print(response.status_code,response.text)
+                print(self.query_str)
+                raise PreventUpdate
+            chunks = []
+            nrows = 0
+            for df in iter_response_chunks(stream, self.chunk_rows):
+                chunks.append(df.iloc[:self.max_rows - nrows])
+                nrows += len(chunks[-1])
+                if nrows >= self.max_rows:
+                    self.truncated = True
+                    print(f'query result cut at {self.max_rows} rows')
+                    print(self.query_str)
+                    break
+        except QueryCancelled:
+            print('query cancelled')
+            print(self.query_str)
+            raise PreventUpdate
+        finally:
+            #stop the download when the row cap is reached or parsing failed
+            self._future.cancel()
+        self._df = pd.concat(chunks, ignore_index=True) if len(chunks)>1 else (chunks[0] if chunks else pd.DataFrame())
+        if self.key is not None:
+            query_cache.set(self.key, self._df)
+        return self._df
+
+    #Abort the download. The chunks not read yet are dropped and the reader
+    #finds QueryCancelled instead, even when the request was never sent.
+    def cancel(self):
+        self._future.cancel()
+        self._loop.call_soon_threadsafe(self._signal_cancelled)
+
+    def _signal_cancelled(self):
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(QueryCancelled())
+
+#Key of a streamed query, results cut at the row cap are cached apart from full results
+def make_stream_key(query_str, max_rows):
+    return make_key(f'{query_str}\n--max_rows={max_rows}', headers['customer'], headers['originator'])
+
+#Send a query without waiting for its response, streaming the body when it is collected.
+#Use it for results that can grow with the size of the field, like per-well rows.
+def submit_query_stream(query_str, max_rows=None, chunk_rows=None, cache=True):
+    max_rows = max_rows or settings['QUERY_MAX_ROWS']
+    chunk_rows = chunk_rows or settings['QUERY_CHUNK_ROWS']
+    key = None
+    if settings['QUERY_CACHE_ENABLED'] and cache:
+        key = make_stream_key(query_str, max_rows)
+        df = query_cache.get(key)
+        if df is not None:
+            return PendingQuery(query_str, key, df=df)
+    return StreamingQuery(query_str, key, max_rows, chunk_rows)
+
+#Run a query reading its response in chunks, at most max_rows rows are kept
+def run_query_stream(query_str, max_rows=None, chunk_rows=None, cache=True):
+    return submit_query_stream(query_str, max_rows, chunk_rows, cache).result()
+# endregion
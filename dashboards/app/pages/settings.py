@@ -16,7 +16,8 @@ regions = {
 }
 
 api_region = os.environ.get("API_REGION")
-api_url = regions[api_region]
+#API_URL points the app to another deployment, e.g. a local mock server
+api_url = os.environ.get("API_URL") or regions[api_region]
 
 
 def load_settings():
@@ -30,4 +31,36 @@ def load_settings():
         "AUTH0_CLIENT_SECRET": os.environ.get("AUTH0_CLIENT_SECRET"),
         "AUTH0_DOMAIN": os.environ.get("AUTH0_DOMAIN"),
         "APP_SECRET_KEY": os.environ.get("APP_SECRET_KEY"),
+        "API_TIMEOUT": float(os.environ.get("API_TIMEOUT", 30)),
+        "API_HTTP2": os.environ.get("API_HTTP2", "true").lower() == "true",
+        "API_MAX_CONNECTIONS": int(os.environ.get("API_MAX_CONNECTIONS", 20)),
+        "API_MAX_KEEPALIVE_CONNECTIONS": int(os.environ.get("API_MAX_KEEPALIVE_CONNECTIONS", 10)),
+        "API_KEEPALIVE_EXPIRY": float(os.environ.get("API_KEEPALIVE_EXPIRY", 60)),
+        "API_RESPONSE_FORMAT": os.environ.get("API_RESPONSE_FORMAT", "arrow").lower(),
+        "QUERY_MAX_ROWS": int(os.environ.get("QUERY_MAX_ROWS", 1000000)),
+        "QUERY_CHUNK_ROWS": int(os.environ.get("QUERY_CHUNK_ROWS", 50000)),
+        "FILTER_DEBOUNCE_MS": int(os.environ.get("FILTER_DEBOUNCE_MS", 300)),
+        "PLOT_DOWNSAMPLING": os.environ.get("PLOT_DOWNSAMPLING", "lttb").lower(),
+        "PLOT_MAX_POINTS": int(os.environ.get("PLOT_MAX_POINTS", 500)),
+        "PLOT_WEBGL_POINTS": int(os.environ.get("PLOT_WEBGL_POINTS", 5000)),
+        "PLOT_WEBGL_TRACES": int(os.environ.get("PLOT_WEBGL_TRACES", 50)),
+        "PLOT_FETCH": os.environ.get("PLOT_FETCH", "full").lower(),
+        "PLOT_COARSE_RESOLUTION": os.environ.get("PLOT_COARSE_RESOLUTION", "quarter").lower(),
+        "PLOT_WINDOW_CACHE_MB": float(os.environ.get("PLOT_WINDOW_CACHE_MB", 64)),
+        "QUERY_CACHE_ENABLED": os.environ.get("QUERY_CACHE_ENABLED", "true").lower() == "true",
+        "QUERY_CACHE_MAX_MB": float(os.environ.get("QUERY_CACHE_MAX_MB", 256)),
+        "QUERY_CACHE_TTL": float(os.environ.get("QUERY_CACHE_TTL", 21600)),
+        "QUERY_CACHE_BACKEND": os.environ.get("QUERY_CACHE_BACKEND", "memory"),
+        "QUERY_CACHE_DIR": os.environ.get("QUERY_CACHE_DIR", "/tmp/dashboards-query-cache"),
+        "QUERY_CACHE_REDIS_URL": os.environ.get("QUERY_CACHE_REDIS_URL", "redis://localhost:6379/0"),
+        "QUERY_ENGINE": os.environ.get("QUERY_ENGINE", "api").lower(),
+        "SNAPSHOT_DIR": os.environ.get("SNAPSHOT_DIR", "/tmp/dashboards-case-snapshots"),
+        "SNAPSHOT_VERSION_TTL": float(os.environ.get("SNAPSHOT_VERSION_TTL", 300)),
+        "SNAPSHOT_VERSION_RETRY": float(os.environ.get("SNAPSHOT_VERSION_RETRY", 60)),
+        "SNAPSHOT_MAX_ROWS": int(os.environ.get("SNAPSHOT_MAX_ROWS", 20000000)),
+        "SNAPSHOT_BUILD_TIMEOUT": float(os.environ.get("SNAPSHOT_BUILD_TIMEOUT", 900)),
+        "SNAPSHOT_RETRY_AFTER": float(os.environ.get("SNAPSHOT_RETRY_AFTER", 3600)),
+        "PREFETCH_ENABLED": os.environ.get("PREFETCH_ENABLED", "true").lower() == "true",
+        "PREFETCH_WORKERS": int(os.environ.get("PREFETCH_WORKERS", 2)),
+        "ADMIN_TOKEN": os.environ.get("ADMIN_TOKEN"),
     }
\ No newline at end of file
@@ -0,0 +1,21 @@
+# region Import Modules
+from pypika import Schema, CustomFunction
+# endregion
+
+# region Utility Functions
+#Database Schema
+aqueon = Schema('aqueon')
+
+##Custom Function to create Distinct Queries
+distinct = CustomFunction('DISTINCT', ['*'])
+make_date = CustomFunction('MAKE_DATE', ['year','month','day'])
+date_trunc = CustomFunction('DATE_TRUNC', ['interval','date'])
+
+#Monthly date column of the production table
+def production_date(productiondata):
+    return make_date(
+        getattr(productiondata, 'Year'),
+        getattr(productiondata, 'Month'),
+        1
+    )
+# endregion
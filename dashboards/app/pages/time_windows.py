@@ -0,0 +1,92 @@
+# region Import Modules
+import hashlib
+import pandas as pd
+from .settings import load_settings
+from .query_cache import QueryCache
+# endregion
+
+# region Global Variables
+#Load Environment Variables
+settings = load_settings()
+
+#Monthly rows of the years already fetched for a series, one entry per series and year.
+#Every worker keeps its own, a year missing here is still served by the query cache.
+window_cache = QueryCache(
+    max_bytes=int(settings['PLOT_WINDOW_CACHE_MB'] * 1024 * 1024),
+    ttl=settings['QUERY_CACHE_TTL'],
+)
+# endregion
+
+
+# region Windows
+#Period of the whole history series of the phase plots, None when they are fetched monthly
+def series_resolution():
+    if settings['PLOT_FETCH'] == 'windowed':
+        return settings['PLOT_COARSE_RESOLUTION']
+    return None
+
+#Years of the zoomed range within the history of a series.
+#Windows are fetched and cached by calendar year so small pans reuse them.
+def window_years(x_range, dates):
+    if x_range is None or len(dates)==0:
+        return []
+    first = max(x_range[0].year, dates.min().year)
+    last = min(x_range[1].year, dates.max().year)
+    return list(range(first, last+1))
+
+#Contiguous runs of years, each run is fetched with a single query
+def year_runs(years):
+    runs = []
+    for year in years:
+        if runs and runs[-1][-1] == year-1:
+            runs[-1].append(year)
+        else:
+            runs.append([year])
+    return runs
+
+#First and last day of a run of years
+def run_window(run):
+    return (f'{run[0]}-01-01', f'{run[-1]}-12-31')
+
+def year_key(series_key, year):
+    return hashlib.sha256(f'{year}\n{series_key}'.encode('utf-8')).hexdigest()
+
+#Monthly rows of a series for some years. Years already in the window cache aren't
+#fetched again, the others are sent as one query per run before waiting for any of them.
+#submit_run(window) sends the query of a window and collect(pending) waits for its rows.
+def fetch_window(series_key, years, submit_run, collect):
+    frames = {}
+    missing = []
+    for year in years:
+        df = window_cache.get(year_key(series_key, year))
+        if df is None:
+            missing.append(year)
+        else:
+            frames[year] = df
+    pending = [(run, submit_run(run_window(run))) for run in year_runs(missing)]
+    for run, p in pending:
+        df = collect(p)
+        df['date'] = pd.to_datetime(df['date'],format='%Y-%m-%d',exact=False)
+        row_years = df['date'].dt.year
+        for year in run:
+            frames[year] = df.loc[row_years==year]
+            window_cache.set(year_key(series_key, year), frames[year])
+    if not frames:
+        return None
+    return pd.concat([frames[year] for year in years], ignore_index=True)
+
+#Coarse rows outside the fetched years and the monthly rows inside them, in date order per group
+def merge_window(coarse, detail, years, keys):
+    if detail is None:
+        return coarse
+    inside = coarse['date'].dt.year.between(years[0], years[-1])
+    df = pd.concat([coarse.loc[~inside], detail], ignore_index=True)
+    return df.sort_values([*keys, 'date'], kind='stable', ignore_index=True)
+
+#Whole history series with the monthly detail of the zoomed range, x_range from relayout_x_range.
+#series_key identifies the series and its filters, e.g. the SQL of the coarse query.
+def refine_window(coarse, series_key, x_range, keys, submit_run, collect):
+    years = window_years(x_range, coarse['date'])
+    detail = fetch_window(series_key, years, submit_run, collect)
+    return merge_window(coarse, detail, years, keys)
+# endregion
@@ -0,0 +1,68 @@
+# region Import Modules
+import numpy as np
+# endregion
+
+# region Global Variables
+#Label and factor from the stored value of every quantity in each unit system.
+#The Aqueon tables hold field units, a new quantity or system is a new entry here.
+unit_systems = {
+    'liquid':{
+        'field':('bbl/d', 1.0),
+        'metric':('m³/d', 0.158987294928),
+    },
+    'gas':{
+        'field':('Mscf/d', 1.0),
+        'metric':('m³/d', 28.316846592),
+    },
+    'pressure':{
+        'field':('psi', 1.0),
+        'metric':('kPa', 6.894757293168),
+    },
+}
+
+#Quantity of the rate of every phase
+phase_quantities = {
+    'oil':'liquid',
+    'gross':'liquid',
+    'water':'liquid',
+    'injectant':'liquid',
+    'gas':'gas',
+}
+
+#Quantity of the secondary properties of the phase plots, the well count has no unit
+property_quantities = {
+    'bhp':'pressure',
+    'wellcount':None,
+}
+# endregion
+
+
+# region Conversion
+#Factor from the stored value of a quantity, 1 for values without a unit
+def unit_factor(quantity, units):
+    if quantity is None:
+        return 1.0
+    return unit_systems[quantity][units][1]
+
+#Factor of a quantity in every unit system, read by the clientside conversion.
+#None for values without a unit, they are never converted.
+def unit_factors(quantity):
+    if quantity is None:
+        return None
+    return {units: factor for units, (label, factor) in unit_systems[quantity].items()}
+
+#Name of a value with its unit, e.g. 'Oil Rate (bbl/d)'
+def unit_title(name, quantity, units):
+    if quantity is None:
+        return name
+    return f'{name} ({unit_systems[quantity][units][0]})'
+
+#Convert the columns {column: quantity} of a frame from the stored units in place,
+#with a single multiply over all of them. Columns missing from the frame are skipped.
+def convert_units(df, quantities, units):
+    cols = [c for c, q in quantities.items() if q is not None and c in df.columns]
+    factors = np.array([unit_factor(quantities[c], units) for c in cols])
+    if len(cols)>0 and (factors != 1).any():
+        df[cols] = df[cols].to_numpy(dtype=float) * factors
+    return df
+# endregion
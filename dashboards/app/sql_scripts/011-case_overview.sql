@@ -0,0 +1,95 @@
+SELECT 
+    COUNT("wells"."WellAPI") "total_wells",
+    SUM("wells"."is_producer") "producer_wells",
+    SUM("wells"."is_injector") "injector_wells",
+    SUM(CASE WHEN "wells"."status_count">1 THEN 1 ELSE 0 END) "conversion_wells",
+    MIN("wells"."min_date") "min_date",
+    MAX("wells"."max_date") "max_date",
+    SUM("wells"."oil_cum") "oil_cum",
+    SUM("wells"."water_cum") "water_cum",
+    SUM("wells"."gas_cum") "gas_cum",
+    SUM("wells"."injectant_cum") "injectant_cum",
+    MAX("layers"."total_layers") "total_layers",
+    MAX("layers"."total_faultblocks") "total_faultblocks",
+    MAX("layers"."total_compartments") "total_compartments" 
+FROM (
+    SELECT 
+        "WellAPI",
+        MAX(CASE WHEN "Qo"+"Qw"+"Qg">0 THEN 1 ELSE 0 END) "is_producer",
+        MAX(CASE WHEN "Qs">0 THEN 1 ELSE 0 END) "is_injector",
+        COUNT(DISTINCT("Status")) "status_count",
+        MIN(MAKE_DATE("Year","Month",1)) "min_date",
+        MAX(MAKE_DATE("Year","Month",1)) "max_date",
+        SUM("Qo"*CASE 
+            WHEN "Month"=1 THEN 31 
+            WHEN "Month"=2 THEN CASE WHEN (MOD("Year",4)=0 AND MOD("Year",100)<>0) OR MOD("Year",400)=0 THEN 29 ELSE 28 END 
+            WHEN "Month"=3 THEN 31 
+            WHEN "Month"=4 THEN 30 
+            WHEN "Month"=5 THEN 31 
+            WHEN "Month"=6 THEN 30 
+            WHEN "Month"=7 THEN 31 
+            WHEN "Month"=8 THEN 31 
+            WHEN "Month"=9 THEN 30 
+            WHEN "Month"=10 THEN 31 
+            WHEN "Month"=11 THEN 30 
+            WHEN "Month"=12 THEN 31 
+        END*1e-06) "oil_cum",
+        SUM("Qw"*CASE 
+            WHEN "Month"=1 THEN 31 
+            WHEN "Month"=2 THEN CASE WHEN (MOD("Year",4)=0 AND MOD("Year",100)<>0) OR MOD("Year",400)=0 THEN 29 ELSE 28 END 
+            WHEN "Month"=3 THEN 31 
+            WHEN "Month"=4 THEN 30 
+            WHEN "Month"=5 THEN 31 
+            WHEN "Month"=6 THEN 30 
+            WHEN "Month"=7 THEN 31 
+            WHEN "Month"=8 THEN 31 
+            WHEN "Month"=9 THEN 30 
+            WHEN "Month"=10 THEN 31 
+            WHEN "Month"=11 THEN 30 
+            WHEN "Month"=12 THEN 31 
+        END*1e-06) "water_cum",
+        SUM("Qg"*CASE 
+            WHEN "Month"=1 THEN 31 
+            WHEN "Month"=2 THEN CASE WHEN (MOD("Year",4)=0 AND MOD("Year",100)<>0) OR MOD("Year",400)=0 THEN 29 ELSE 28 END 
+            WHEN "Month"=3 THEN 31 
+            WHEN "Month"=4 THEN 30 
+            WHEN "Month"=5 THEN 31 
+            WHEN "Month"=6 THEN 30 
+            WHEN "Month"=7 THEN 31 
+            WHEN "Month"=8 THEN 31 
+            WHEN "Month"=9 THEN 30 
+            WHEN "Month"=10 THEN 31 
+            WHEN "Month"=11 THEN 30 
+            WHEN "Month"=12 THEN 31 
+        END*1e-06) "gas_cum",
+        SUM("Qs"*CASE 
+            WHEN "Month"=1 THEN 31 
+            WHEN "Month"=2 THEN CASE WHEN (MOD("Year",4)=0 AND MOD("Year",100)<>0) OR MOD("Year",400)=0 THEN 29 ELSE 28 END 
+            WHEN "Month"=3 THEN 31 
+            WHEN "Month"=4 THEN 30 
+            WHEN "Month"=5 THEN 31 
+            WHEN "Month"=6 THEN 30 
+            WHEN "Month"=7 THEN 31 
+            WHEN "Month"=8 THEN 31 
+            WHEN "Month"=9 THEN 30 
+            WHEN "Month"=10 THEN 31 
+            WHEN "Month"=11 THEN 30 
+            WHEN "Month"=12 THEN 31 
+        END*1e-06) "injectant_cum" 
+    FROM 
+        "aqueon"."productiondata" 
+    WHERE 
+        "casename"={case_name}
+    GROUP BY 
+        "WellAPI"
+) "wells",
+(
+    SELECT 
+        COUNT(DISTINCT("Reservoir")) "total_layers",
+        COUNT(DISTINCT("FaultBlock")) "total_faultblocks",
+        COUNT(DISTINCT("Compartment")) "total_compartments" 
+    FROM 
+        "aqueon"."completiondata" 
+    WHERE 
+        "casename"={case_name}
+) "layers"
\ No newline at end of file
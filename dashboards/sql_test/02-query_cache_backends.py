@@ -0,0 +1,41 @@
+import os
+import sys
+import subprocess
+import tempfile
+import time
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'app'))
+from pages.cache_backends import FileCacheBackend, RedisCacheBackend
+
+#Round trip a query result through the shared cache backends.
+#The redis backend runs against redis_standin.py on a free local port.
+def main():
+    df = pd.DataFrame({
+        'WellAPI':['A-1','A-2','A-3'],
+        'date':pd.to_datetime(['2020-01-01','2020-02-01','2020-03-01']),
+        'oil':[10.5,None,30.25],
+        'wellcount':[1,2,3],
+    })
+
+    with tempfile.TemporaryDirectory() as path:
+        cache = FileCacheBackend(path, max_bytes=10 * 1024 * 1024, ttl=60)
+        print('file miss', cache.get('key') is None)
+        cache.set('key', df)
+        pd.testing.assert_frame_equal(cache.get('key'), df)
+        print('file', cache.stats())
+
+    port = '6390'
+    server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(__file__), 'redis_standin.py'), port])
+    try:
+        time.sleep(1)
+        cache = RedisCacheBackend(f'redis://localhost:{port}/0', ttl=60)
+        print('redis miss', cache.get('key') is None)
+        cache.set('key', df)
+        pd.testing.assert_frame_equal(cache.get('key'), df)
+        print('redis', cache.stats())
+    finally:
+        server.terminate()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import os
+import sys
+import subprocess
+import time
+import httpx
+
+#Point the query client to the mock before it loads the settings
+port = '8765'
+os.environ['API_URL'] = f'http://localhost:{port}'
+os.environ['QUERY_CACHE_ENABLED'] = 'false'
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'app'))
+from pages.query_client import accept_formats, response_to_frame, run_query
+
+#Parse the same result in every response format offered by mock_dataexplorer.py
+#and check that dates and numerics keep their dtypes.
+def main():
+    server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(__file__), 'mock_dataexplorer.py'), port])
+    try:
+        time.sleep(2)
+        frames = {}
+        with httpx.Client(base_url=os.environ['API_URL'], timeout=60) as client:
+            for fmt, accept in accept_formats.items():
+                response = client.post('/dataexplorer/query/tachyus', content='SELECT 1', headers={'Accept':accept})
+                start = time.perf_counter()
+                df = response_to_frame(response)
+                elapsed = time.perf_counter() - start
+                frames[fmt] = df
+                print(f"{fmt:8} {response.headers['content-type']:38} {len(response.content)/1e6:7.2f} MB {elapsed*1e3:8.1f} ms")
+                print('         ', dict(df.dtypes.astype(str)))
+
+        for fmt in ('arrow', 'parquet'):
+            assert str(frames[fmt]['date'].dtype).startswith('datetime64'), fmt
+            assert frames[fmt]['oil'].dtype == 'float64', fmt
+            assert frames[fmt]['wellcount'].dtype == 'int64', fmt
+            assert (frames[fmt]['oil'] == frames['json']['oil']).all(), fmt
+
+        df = run_query('SELECT 1')
+        print('run_query', df.shape, dict(df.dtypes.astype(str)))
+    finally:
+        server.terminate()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'app'))
+from pages.local_engine import to_duckdb, run_local_query
+from pages.case_snapshot import snapshot_tables
+from pages.overview import build_overview_query
+from pages.production import build_production_query
+
+#A small case written like a snapshot. Year and Month are floats, like columns
+#that went through a JSON response, which plain DuckDB MAKE_DATE rejects.
+def write_case(path, case_name='TEST', wells=6, months=24):
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2000-01-01', periods=months, freq='MS')
+    apis = [f'API{i:03d}' for i in range(wells)]
+    tables = {
+        'productiondata':pd.DataFrame({
+            'casename':case_name,
+            'WellAPI':np.repeat(apis, months),
+            'CompSubId':1,
+            'Year':np.tile(dates.year, wells).astype(float),
+            'Month':np.tile(dates.month, wells).astype(float),
+            'Qo':rng.gamma(2, 50, wells * months),
+            'Qw':rng.gamma(2, 80, wells * months),
+            'Qg':rng.gamma(2, 120, wells * months),
+            'Qs':0.0,
+            'BHP':1000.0,
+            'Status':1,
+        }),
+        'completiondata':pd.DataFrame({
+            'casename':case_name,
+            'WellAPI':apis,
+            'WellName':[f'W-{i}' for i in range(wells)],
+            'CompSubId':1,
+            'Reservoir':[f'R{i % 2}' for i in range(wells)],
+            'FaultBlock':'FB1',
+            'Compartment':'C1',
+        }),
+        'fit_info':pd.DataFrame({'casename':[case_name], 'FitStartDate':['2000-01-01']}),
+        'producer_timestep':pd.DataFrame({'casename':[case_name], 'WellId':[apis[0]]}),
+        'injector_timestep':pd.DataFrame({'casename':[case_name], 'WellId':[apis[0]]}),
+    }
+    files = {}
+    for name in snapshot_tables:
+        files[name] = os.path.join(path, f'{name}.parquet')
+        pq.write_table(pa.Table.from_pandas(tables[name], preserve_index=False), files[name])
+    return files, tables['productiondata']
+
+#Run the overview and production statements built for the API on a local snapshot
+def main():
+    print(to_duckdb("""SELECT EXTRACT(DAY FROM DATE_TRUNC('MONTH',MAKE_DATE("Year","Month",1))) "d",'MAKE_DATE(' "EXTRACT(" FROM t"""))
+    with tempfile.TemporaryDirectory() as path:
+        files, production = write_case(path)
+
+        overview = run_local_query(files, build_overview_query('TEST').get_sql())
+        print(overview.iloc[0].to_dict())
+        assert overview['total_wells'].dtype == 'int64'
+        assert overview['producer_wells'].dtype == 'int64'
+        days = pd.to_datetime(dict(year=production['Year'], month=production['Month'], day=1)).dt.days_in_month
+        assert np.isclose(overview['oil_cum'][0], (production['Qo'] * days).sum() * 1e-6)
+
+        query = build_production_query('TEST', ['Reservoir'], {'WellAPI':[], 'Reservoir':[], 'Compartment':[], 'FaultBlock':[]})
+        df = run_local_query(files, query.get_sql())
+        print(df.head())
+        print(dict(df.dtypes.astype(str)))
+        assert str(df['date'].dtype).startswith('datetime64')
+        assert np.isclose(df['oil'].sum(), production['Qo'].sum())
+
+        assert run_local_query(files, 'SELECT 7/2 "half"')['half'][0] == 3
+
+if __name__ == '__main__':
+    main()
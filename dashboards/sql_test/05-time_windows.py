@@ -0,0 +1,67 @@
+import os
+import sys
+import tempfile
+import importlib.util
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'app'))
+from pages.local_engine import run_local_query
+from pages.query_builder import production_sql
+from pages.time_windows import refine_window, window_cache
+
+#the synthetic case of the local engine test
+spec = importlib.util.spec_from_file_location('local_engine_test', os.path.join(os.path.dirname(__file__), '04-local_engine.py'))
+local_engine_test = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(local_engine_test)
+
+no_filters = {'WellAPI':[], 'Reservoir':[], 'Compartment':[], 'FaultBlock':[]}
+
+def frame(df):
+    df['date'] = pd.to_datetime(df['date'],format='%Y-%m-%d',exact=False)
+    return df
+
+#Coarse whole history, then the monthly rows of a zoomed range merged in and served
+#from the window cache when the same years are shown again
+def main():
+    with tempfile.TemporaryDirectory() as path:
+        files, production = local_engine_test.write_case(path, months=60)
+        agg = ['Reservoir']
+        monthly = frame(run_local_query(files, production_sql('TEST', agg, no_filters)))
+
+        coarse_str = production_sql('TEST', agg, no_filters, 'quarter')
+        coarse = frame(run_local_query(files, coarse_str))
+        print(coarse.head())
+        assert len(coarse) == len(monthly) // 3
+        quarters = monthly.groupby(['Reservoir', monthly['date'].dt.to_period('Q')])['oil'].mean()
+        assert np.allclose(coarse['oil'].values, quarters.values)
+        assert coarse['producer_rows'].sum() == monthly['producer_rows'].sum()
+
+        sent = []
+        def submit_run(window):
+            sent.append(window)
+            return production_sql('TEST', agg, no_filters, window=window)
+        def collect(query_str):
+            return run_local_query(files, query_str)
+
+        x_range = (pd.Timestamp('2001-03-15'), pd.Timestamp('2002-06-01'))
+        df = refine_window(coarse, coarse_str, x_range, agg, submit_run, collect)
+        print(sent)
+        assert sent == [('2001-01-01', '2002-12-31')]
+        inside = df['date'].dt.year.isin([2001, 2002])
+        assert inside.sum() == 24 * 2
+        assert (~inside).sum() == len(coarse) - 8 * 2
+        assert df.groupby('Reservoir')['date'].apply(lambda d: d.is_monotonic_increasing).all()
+        assert np.allclose(df.loc[inside, 'oil'].values, monthly.loc[monthly['date'].dt.year.isin([2001, 2002]), 'oil'].values)
+
+        #panning back over 2002 only fetches 2003
+        sent.clear()
+        refine_window(coarse, coarse_str, (pd.Timestamp('2002-01-01'), pd.Timestamp('2003-12-01')), agg, submit_run, collect)
+        assert sent == [('2003-01-01', '2003-12-31')]
+        sent.clear()
+        refine_window(coarse, coarse_str, (pd.Timestamp('2001-01-01'), pd.Timestamp('2003-12-01')), agg, submit_run, collect)
+        assert sent == []
+        print(window_cache.stats())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+import tempfile
+import importlib.util
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'app'))
+from pages.local_engine import run_local_query
+from pages.case_snapshot import build_rollups, rollup_tables
+from pages.production import rollup_levels
+from pages.query_builder import production_sql, rollup_sql
+
+#the synthetic case of the local engine test
+spec = importlib.util.spec_from_file_location('local_engine_test', os.path.join(os.path.dirname(__file__), '04-local_engine.py'))
+local_engine_test = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(local_engine_test)
+
+no_filters = {'WellAPI':[], 'Reservoir':[], 'Compartment':[], 'FaultBlock':[]}
+
+def timed(files, query_str):
+    start = time.perf_counter()
+    df = run_local_query(files, query_str)
+    return df, time.perf_counter() - start
+
+#Every rollup level answers like the query on the tables, with and without filters on its columns
+def main():
+    with tempfile.TemporaryDirectory() as path:
+        files, production = local_engine_test.write_case(path, wells=40, months=120)
+        build_rollups('TEST', path)
+        files.update({name: os.path.join(path, f'{name}.parquet') for name in rollup_tables})
+
+        cases = []
+        for level in rollup_levels:
+            agg = list(reversed(level))
+            cases.append((agg, no_filters, None, None))
+            cases.append((agg, no_filters, 'year', None))
+            cases.append((agg, no_filters, None, ('2003-01-01', '2004-12-31')))
+            if agg:
+                values = sorted(production[agg[0]].unique()) if agg[0] in production else ['R0']
+                cases.append((agg, {**no_filters, agg[0]:values[:1]}, None, None))
+        for agg, filters, resolution, window in cases:
+            expected, t_tables = timed(files, production_sql('TEST', agg, filters, resolution, window))
+            df, t_rollup = timed(files, rollup_sql(agg, filters, resolution, window))
+            pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+            print(agg, resolution, window, len(df), f'{t_tables*1e3:.1f} ms -> {t_rollup*1e3:.1f} ms')
+
+        assert rollup_sql(['Reservoir'], {**no_filters, 'WellAPI':['API000']}) is None
+        assert rollup_sql(['Type'], no_filters) is None
+
+if __name__ == '__main__':
+    main()
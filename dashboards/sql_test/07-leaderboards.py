@@ -0,0 +1,61 @@
+import os
+import sys
+import tempfile
+import importlib.util
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'app'))
+from pages.local_engine import run_local_query
+from pages.production import actual_columns
+from pages.leaderboards import build_leaderboard_query, compute_rankings, ranking_key, leaderboard_cache, leaderboard_rows, leaderboard_dimensions
+
+#the synthetic case of the local engine test
+spec = importlib.util.spec_from_file_location('local_engine_test', os.path.join(os.path.dirname(__file__), '04-local_engine.py'))
+local_engine_test = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(local_engine_test)
+
+#Every ranking from the one completion query matches the cumulatives summed by pandas,
+#and the pages of the grids follow the ranking or the sort model
+def main():
+    with tempfile.TemporaryDirectory() as path:
+        files, production = local_engine_test.write_case(path, wells=40, months=36)
+        #a few injectors
+        production['Qs'] = np.where(production['WellAPI'].isin(['API003', 'API017', 'API030']), 500.0, 0.0)
+        pq.write_table(pa.Table.from_pandas(production, preserve_index=False), files['productiondata'])
+        completions = pd.read_parquet(files['completiondata'])
+
+        query_str = build_leaderboard_query('TEST').get_sql()
+        rankings = compute_rankings(run_local_query(files, query_str))
+        for (d, p), df in rankings.items():
+            leaderboard_cache.set(ranking_key(query_str, d, p), df)
+
+        days = pd.to_datetime(dict(year=production['Year'], month=production['Month'], day=1)).dt.days_in_month
+        merged = production.merge(completions.drop(columns='casename'), on=['WellAPI', 'CompSubId'], how='left')
+        for p, cols in actual_columns.items():
+            merged[f'{p}_cum'] = merged[cols].sum(axis=1) * days * 1e-3
+        for dimension, spec in leaderboard_dimensions.items():
+            groups = merged.groupby(spec['column'])[[f'{p}_cum' for p in actual_columns]].sum()
+            if 'members' in spec:
+                groups = groups.loc[groups[f"{spec['members']}_cum"] > 0]
+            for p in actual_columns:
+                expected = groups[f'{p}_cum'].loc[lambda c: c > 0].sort_values(ascending=False)
+                ranked = rankings[(dimension, p)]
+                assert list(ranked[spec['column']]) == list(expected.index), (dimension, p)
+                assert np.allclose(ranked[f'{p}_cum'], expected.values, atol=0.01)
+                assert list(ranked['rank']) == list(range(1, len(expected)+1))
+        assert len(rankings[('injectors', 'oil')]) == 3
+        print(rankings[('reservoirs', 'gas')])
+
+        page = leaderboard_rows('TEST', 'wells', 'oil', {'startRow':10, 'endRow':20})
+        print(page)
+        assert page['rowCount'] == 40
+        assert [r['rank'] for r in page['rowData']] == list(range(11, 21))
+        page = leaderboard_rows('TEST', 'wells', 'water', {'startRow':0, 'endRow':10, 'sortModel':[{'colId':'water_cum', 'sort':'asc'}]})
+        assert [r['rank'] for r in page['rowData']] == list(range(40, 30, -1))
+        print(leaderboard_cache.stats())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#Local mock of the Data Explorer query endpoint to try the response formats.
+#Every query answers the same monthly per-well production table, encoded as
+#Arrow IPC stream, Arrow IPC file, Parquet or JSON following the Accept header.
+#
+#usage: python mock_dataexplorer.py [port] [wells] [months] [formats]
+#       formats is a comma separated list of the formats the mock offers, e.g. json
+#then:  API_URL=http://localhost:8765 python ./app/index.py
+import io
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+media_types = {
+    'arrow':'application/vnd.apache.arrow.stream',
+    'arrow-file':'application/vnd.apache.arrow.file',
+    'parquet':'application/vnd.apache.parquet',
+    'json':'application/json',
+}
+
+#Monthly production of every well, like the productiondata rows behind the phase plots
+def build_table(wells, months):
+    rng = np.random.default_rng(0)
+    dates = pd.date_range('2000-01-01', periods=months, freq='MS')
+    df = pd.DataFrame({
+        'WellAPI':np.repeat([f'WELL-{i:05d}' for i in range(wells)], months),
+        'date':np.tile(dates.values.astype('datetime64[D]'), wells),
+        'oil':rng.gamma(2, 50, wells * months),
+        'water':rng.gamma(2, 80, wells * months),
+        'gas':rng.gamma(2, 120, wells * months),
+        'wellcount':np.ones(wells * months, dtype='int64'),
+    })
+    #date32 like the SQL DATE columns returned by MAKE_DATE
+    return pa.Table.from_pandas(df, preserve_index=False).cast(pa.schema([
+        ('WellAPI', pa.string()),
+        ('date', pa.date32()),
+        ('oil', pa.float64()),
+        ('water', pa.float64()),
+        ('gas', pa.float64()),
+        ('wellcount', pa.int64()),
+    ]))
+
+def encode(table, fmt):
+    if fmt == 'arrow':
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            #record batches of 10000 rows so clients can parse the stream as it arrives
+            writer.write_table(table, max_chunksize=10000)
+        return sink.getvalue().to_pybytes()
+    if fmt == 'arrow-file':
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    if fmt == 'parquet':
+        sink = io.BytesIO()
+        pq.write_table(table, sink)
+        return sink.getvalue()
+    #JSON records with ISO dates, like the Data Explorer API
+    records = table.to_pandas().astype({'date':str}).to_dict('records')
+    return json.dumps(records).encode()
+
+#Pick the offered format with the highest q value in the Accept header
+def negotiate(accept, offered):
+    ranked = []
+    for item in accept.split(','):
+        parts = [i.strip() for i in item.split(';')]
+        q = 1.0
+        for p in parts[1:]:
+            if p.startswith('q='):
+                q = float(p[2:])
+        ranked.append((q, parts[0]))
+    for q, media_type in sorted(ranked, key=lambda i: -i[0]):
+        for fmt in offered:
+            if media_types[fmt] == media_type:
+                return fmt
+    return 'json'
+
+def make_handler(table, offered):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('content-length', 0)))
+            if self.path != '/dataexplorer/query/tachyus':
+                self.send_error(404)
+                return
+            fmt = negotiate(self.headers.get('accept', 'application/json'), offered)
+            body = encode(table, fmt)
+            self.send_response(200)
+            self.send_header('content-type', media_types[fmt])
+            self.send_header('content-length', str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except ConnectionError:
+                #streaming clients hang up once they reach their row cap
+                pass
+
+        def log_message(self, format, *args):
+            pass
+    return Handler
+
+def main(port, wells, months, offered):
+    table = build_table(wells, months)
+    server = ThreadingHTTPServer(('localhost', port), make_handler(table, offered))
+    print(f'mock data explorer listening on localhost:{port} ({table.num_rows} rows, {",".join(offered)})')
+    server.serve_forever()
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(
+        int(args[0]) if len(args) > 0 else 8765,
+        int(args[1]) if len(args) > 1 else 500,
+        int(args[2]) if len(args) > 2 else 240,
+        args[3].split(',') if len(args) > 3 else list(media_types),
+    )
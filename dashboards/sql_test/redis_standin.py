@@ -0,0 +1,107 @@
+#Minimal Redis compatible server to try the redis query cache backend locally.
+#It speaks enough RESP for the cache: PING, GET, SET (EX/PX), DEL, EXISTS, SCAN,
+#FLUSHDB, HELLO and CLIENT. Data lives in memory and is lost when the server stops.
+#
+#usage: python redis_standin.py [port]
+#then:  QUERY_CACHE_BACKEND=redis QUERY_CACHE_REDIS_URL=redis://localhost:6379/0 python ./app/index.py
+import asyncio
+import fnmatch
+import sys
+import time
+
+store = {}
+
+#RESP2 and RESP3 only differ in the null reply for the commands supported here
+def encode(value, proto=2):
+    if value is None:
+        return b'_\r\n' if proto == 3 else b'$-1\r\n'
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, dict):
+        return b'%%%d\r\n' % len(value) + b''.join(encode(k) + encode(v) for k, v in value.items())
+    if isinstance(value, list):
+        return b'*%d\r\n' % len(value) + b''.join(encode(i, proto) for i in value)
+    if isinstance(value, str):
+        return f'+{value}\r\n'.encode()
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+def get_value(key):
+    value, expires = store.get(key, (None, None))
+    if expires is not None and expires < time.monotonic():
+        store.pop(key, None)
+        return None
+    return value
+
+def execute(args):
+    command = args[0].upper()
+    if command == b'PING':
+        return 'PONG'
+    if command == b'GET':
+        return get_value(args[1])
+    if command == b'SET':
+        expires = None
+        options = [i.upper() for i in args[3:]]
+        if b'EX' in options:
+            expires = time.monotonic() + int(args[3 + options.index(b'EX') + 1])
+        if b'PX' in options:
+            expires = time.monotonic() + int(args[3 + options.index(b'PX') + 1]) / 1000
+        store[args[1]] = (args[2], expires)
+        return 'OK'
+    if command == b'DEL':
+        return sum(store.pop(k, None) is not None for k in args[1:])
+    if command == b'EXISTS':
+        return sum(get_value(k) is not None for k in args[1:])
+    if command == b'SCAN':
+        options = [i.upper() for i in args[2:]]
+        pattern = args[2 + options.index(b'MATCH') + 1].decode() if b'MATCH' in options else '*'
+        keys = [k for k in list(store) if get_value(k) is not None and fnmatch.fnmatchcase(k.decode(), pattern)]
+        return [b'0', keys]
+    if command == b'FLUSHDB':
+        store.clear()
+        return 'OK'
+    if command == b'HELLO':
+        proto = int(args[1]) if len(args) > 1 else 2
+        return {b'server':b'redis', b'version':b'7.0.0', b'proto':proto}
+    if command in (b'CLIENT', b'SELECT'):
+        return 'OK'
+    raise ValueError(f"unknown command '{command.decode()}'")
+
+async def read_command(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    n = int(line[1:])
+    args = []
+    for _ in range(n):
+        size = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(size + 2))[:-2])
+    return args
+
+async def handle(reader, writer):
+    proto = 2
+    try:
+        while True:
+            args = await read_command(reader)
+            if args is None:
+                break
+            try:
+                value = execute(args)
+                if args[0].upper() == b'HELLO':
+                    proto = value[b'proto']
+                writer.write(encode(value, proto))
+            except (ValueError, IndexError) as e:
+                writer.write(f'-ERR {e}\r\n'.encode())
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def main(port):
+    server = await asyncio.start_server(handle, 'localhost', port)
+    print(f'redis stand-in listening on localhost:{port}')
+    async with server:
+        await server.serve_forever()
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 6379))